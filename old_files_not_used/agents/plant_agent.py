@@ -30,7 +30,7 @@ from dataclasses import dataclass
 from google import genai
 from dotenv import load_dotenv
 from fastembed import TextEmbedding
-from qdrant_client import QdrantClient
+from qdrant_client import QdrantClient, models
 
 # Setup logging
 logging.basicConfig(
@@ -66,6 +66,7 @@ class PlantRAGAgent:
         collection_name: str = "plant-knowledge",
         text_model: str = "Qdrant/clip-ViT-B-32-text",
         gemini_model: str = "gemini-2.0-flash-exp",
+        qdrant_client: Optional[QdrantClient] = None,
     ):
         """
         Initialize the Plant RAG Agent.
@@ -77,11 +78,12 @@ class PlantRAGAgent:
             collection_name: Name of Qdrant collection with plant knowledge
             text_model: Text embedding model for search
             gemini_model: Gemini model for answer generation
+            qdrant_client: Existing client to reuse instead of opening a new connection
         """
         logger.info("🌱 Initializing Plant RAG Agent...")
         
-        # Initialize Qdrant client
-        self.qdrant_client = QdrantClient(
+        # Initialize Qdrant client (or reuse the caller's pooled one)
+        self.qdrant_client = qdrant_client or QdrantClient(
             url=qdrant_url,
             api_key=qdrant_api_key
         )
@@ -129,18 +131,7 @@ class PlantRAGAgent:
             ).points
             
             # Convert to KnowledgeSource objects
-            sources = []
-            for result in search_results:
-                sources.append(KnowledgeSource(
-                    question=result.payload.get("question", ""),
-                    answer=result.payload.get("answer", ""),
-                    category=result.payload.get("category", "general"),
-                    score=result.score,
-                    metadata={
-                        k: v for k, v in result.payload.items()
-                        if k not in ["question", "answer", "category"]
-                    }
-                ))
+            sources = [self._to_source(result) for result in search_results]
             
             logger.info(f"✅ Found {len(sources)} relevant sources")
             return sources
@@ -149,6 +140,78 @@ class PlantRAGAgent:
             logger.error(f"❌ Search failed: {e}")
             raise
     
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Embed several questions with one call to the text embedding model."""
+        return [embedding.tolist() for embedding in self.text_embedding.embed(queries)]
+    
+    def search_knowledge_batch(
+        self,
+        queries: List[str],
+        limit: int = 5,
+        score_threshold: float = 0.3,
+        query_vectors: Optional[List[List[float]]] = None
+    ) -> List[List[KnowledgeSource]]:
+        """
+        Search the knowledge base for several questions in one round trip.
+        
+        All queries are embedded in a single batch (unless `query_vectors`
+        from embed_queries are given) and sent to Qdrant as one
+        query_batch_points request.
+        
+        Args:
+            queries: User questions
+            limit: Maximum number of results per question
+            score_threshold: Minimum similarity score (0-1)
+            query_vectors: Precomputed embeddings of `queries`, in order
+            
+        Returns:
+            One list of KnowledgeSource objects per question, in query order
+        """
+        logger.info(f"🔍 Searching knowledge base for {len(queries)} questions")
+        
+        try:
+            if query_vectors is None:
+                query_vectors = self.embed_queries(queries)
+            
+            responses = self.qdrant_client.query_batch_points(
+                collection_name=self.collection_name,
+                requests=[
+                    models.QueryRequest(
+                        query=vector,
+                        limit=limit,
+                        score_threshold=score_threshold,
+                        with_payload=True
+                    )
+                    for vector in query_vectors
+                ]
+            )
+            
+            source_batches = [
+                [self._to_source(result) for result in response.points]
+                for response in responses
+            ]
+            
+            logger.info(f"✅ Found {sum(map(len, source_batches))} relevant sources")
+            return source_batches
+            
+        except Exception as e:
+            logger.error(f"❌ Batch search failed: {e}")
+            raise
+    
+    @staticmethod
+    def _to_source(result) -> KnowledgeSource:
+        """Convert a Qdrant scored point into a KnowledgeSource."""
+        return KnowledgeSource(
+            question=result.payload.get("question", ""),
+            answer=result.payload.get("answer", ""),
+            category=result.payload.get("category", "general"),
+            score=result.score,
+            metadata={
+                k: v for k, v in result.payload.items()
+                if k not in ["question", "answer", "category"]
+            }
+        )
+    
     def generate_answer(
         self,
         query: str,
@@ -169,13 +232,56 @@ class PlantRAGAgent:
         logger.info("🤖 Generating answer with Gemini...")
         
         if not sources:
-            return {
-                "query": query,
-                "answer": "I don't have enough information to answer that question. Please try rephrasing or asking about a different plant-related topic.",
-                "sources": [],
-                "confidence": 0.0
-            }
+            return self._no_answer(query)
         
+        try:
+            # Generate answer with Gemini
+            response = self.gemini_client.models.generate_content(
+                model=self.gemini_model,
+                contents=self._build_prompt(query, sources)
+            )
+            return self._build_result(query, sources, response.text, include_sources)
+            
+        except Exception as e:
+            logger.error(f"❌ Answer generation failed: {e}")
+            raise
+    
+    async def agenerate_answer(
+        self,
+        query: str,
+        sources: List[KnowledgeSource],
+        include_sources: bool = True
+    ) -> Dict[str, Any]:
+        """Async variant of generate_answer, so several answers can be generated concurrently."""
+        logger.info("🤖 Generating answer with Gemini...")
+        
+        if not sources:
+            return self._no_answer(query)
+        
+        try:
+            response = await self.gemini_client.aio.models.generate_content(
+                model=self.gemini_model,
+                contents=self._build_prompt(query, sources)
+            )
+            return self._build_result(query, sources, response.text, include_sources)
+            
+        except Exception as e:
+            logger.error(f"❌ Answer generation failed: {e}")
+            raise
+    
+    @staticmethod
+    def _no_answer(query: str) -> Dict[str, Any]:
+        """Response used when no knowledge sources were retrieved."""
+        return {
+            "query": query,
+            "answer": "I don't have enough information to answer that question. Please try rephrasing or asking about a different plant-related topic.",
+            "sources": [],
+            "confidence": 0.0
+        }
+    
+    @staticmethod
+    def _build_prompt(query: str, sources: List[KnowledgeSource]) -> str:
+        """Build the Gemini prompt from the retrieved sources."""
         # Build context from sources
         context_parts = []
         for i, source in enumerate(sources, 1):
@@ -188,7 +294,7 @@ class PlantRAGAgent:
         context = "\n".join(context_parts)
         
         # Create prompt for Gemini
-        prompt = f"""You are a knowledgeable plant and agriculture expert. Answer the user's question based on the following knowledge base entries.
+        return f"""You are a knowledgeable plant and agriculture expert. Answer the user's question based on the following knowledge base entries.
 
 KNOWLEDGE BASE:
 {context}
@@ -204,42 +310,39 @@ INSTRUCTIONS:
 6. Do not make up information not present in the knowledge base
 
 ANSWER:"""
-
-        try:
-            # Generate answer with Gemini
-            response = self.gemini_client.models.generate_content(
-                model=self.gemini_model,
-                contents=prompt
-            )
-            
-            answer = response.text.strip()
-            
-            # Calculate confidence based on source scores
-            avg_score = sum(s.score for s in sources) / len(sources)
-            confidence = min(avg_score * 1.2, 1.0)  # Scale up slightly, cap at 1.0
-            
-            result = {
-                "query": query,
-                "answer": answer,
-                "sources": [
-                    {
-                        "question": s.question,
-                        "answer": s.answer,
-                        "category": s.category,
-                        "score": s.score
-                    }
-                    for s in sources
-                ] if include_sources else [],
-                "confidence": confidence,
-                "num_sources": len(sources)
-            }
-            
-            logger.info(f"✅ Answer generated (confidence: {confidence:.2f})")
-            return result
-            
-        except Exception as e:
-            logger.error(f"❌ Answer generation failed: {e}")
-            raise
+    
+    @staticmethod
+    def _build_result(
+        query: str,
+        sources: List[KnowledgeSource],
+        text: str,
+        include_sources: bool
+    ) -> Dict[str, Any]:
+        """Package Gemini's answer with its sources and a confidence score."""
+        answer = text.strip()
+        
+        # Calculate confidence based on source scores
+        avg_score = sum(s.score for s in sources) / len(sources)
+        confidence = min(avg_score * 1.2, 1.0)  # Scale up slightly, cap at 1.0
+        
+        result = {
+            "query": query,
+            "answer": answer,
+            "sources": [
+                {
+                    "question": s.question,
+                    "answer": s.answer,
+                    "category": s.category,
+                    "score": s.score
+                }
+                for s in sources
+            ] if include_sources else [],
+            "confidence": confidence,
+            "num_sources": len(sources)
+        }
+        
+        logger.info(f"✅ Answer generated (confidence: {confidence:.2f})")
+        return result
     
     def answer_question(
         self,
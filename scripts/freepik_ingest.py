@@ -2,13 +2,20 @@ import os
 import uuid
 import logging
 import time
+import tempfile
+import queue
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Dict, Any, Optional
 from dotenv import load_dotenv
 from qdrant_client import QdrantClient
 from qdrant_client.http import models
 from fastembed import ImageEmbedding
+import numpy as np
 import requests
-from PIL import Image
+from requests.adapters import HTTPAdapter
+from PIL import Image, ImageOps
 from io import BytesIO
 import google.generativeai as genai
 import json
@@ -19,9 +26,50 @@ import argparse
 # CONFIGURATION
 # ==========================================
 COLLECTION_NAME = "freepik_landscaping"
-BATCH_SIZE = 20
-RATE_LIMIT_DELAY = 4.0  # Increased delay to respect Gemini rate limits
+BATCH_SIZE = 64  # Images per embed + upsert batch
+FREEPIK_RATE_LIMIT = 1.0  # Freepik API requests per second, shared by all page fetches
 LIMIT = 20000  # Increased limit for better coverage
+PAGES_PER_TERM = 10
+PAGE_WORKERS = 4  # Concurrent Freepik page fetches, shared by all search terms
+TERM_WORKERS = 4  # Search terms paginated in parallel
+
+# Pipeline stages (search -> download -> Gemini -> embed/upsert)
+DOWNLOAD_WORKERS = 8
+GEMINI_WORKERS = 4
+GEMINI_BATCH_SIZE = 6  # Images analyzed per Gemini request
+QUEUE_SIZE = 64  # Bounded queues give backpressure between stages
+
+# Previews are decoded straight to this size: large enough for CLIP (224px)
+# and within Gemini's single-tile image size (384px).
+PREVIEW_SIZE = (384, 384)
+MAX_PREVIEW_BYTES = 2_000_000  # Skip previews larger than this
+CLIP_INPUT_SIZE = (224, 224)  # CLIP ViT-B/32 input resolution
+
+# Blank/placeholder preview detection (on a 32x32 downsample, 0-255 scale)
+MIN_PREVIEW_STD = 8
+MIN_PREVIEW_MEAN = 12
+MAX_PREVIEW_MEAN = 244
+
+# Namespace for deterministic point IDs, so re-ingesting an asset overwrites it
+POINT_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "https://www.freepik.com")
+
+# Local record of already-ingested Freepik assets and fully processed
+# (search_term, page) cursors, used to skip and resume on re-runs
+STATE_DB = f".{COLLECTION_NAME}_state.sqlite"
+
+# Structured output schema for Gemini image analysis
+ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "specific_name": {"type": "string"},
+        "price_estimate": {"type": "string"},
+        "description": {"type": "string"},
+    },
+    "required": ["specific_name", "price_estimate", "description"],
+}
+
+# Fallback extractor for JSON wrapped in markdown code fences
+JSON_BLOCK_RE = re.compile(r"```(?:json)?\s*(.*?)\s*```", re.S)
 
 # Landscaping-focused search terms
 SEARCH_TERMS = [
@@ -78,6 +126,23 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Shared HTTP session so API calls and preview downloads reuse pooled connections
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=DOWNLOAD_WORKERS, pool_maxsize=DOWNLOAD_WORKERS))
+SESSION.mount("http://", HTTPAdapter(pool_connections=DOWNLOAD_WORKERS, pool_maxsize=DOWNLOAD_WORKERS))
+
+def select_onnx_providers() -> List[str]:
+    """
+    Return the ONNX Runtime execution providers to embed with, GPU first.
+    
+    CUDA is only used when the installed onnxruntime build supports it
+    (e.g. via `pip install fastembed-gpu`); otherwise embedding runs on CPU.
+    """
+    import onnxruntime as ort
+    
+    available = set(ort.get_available_providers())
+    return [p for p in ("CUDAExecutionProvider", "CPUExecutionProvider") if p in available]
+
 def load_environment():
     """Load and validate environment variables."""
     load_dotenv()
@@ -114,6 +179,12 @@ def init_qdrant(endpoint: str, api_key: str, vector_size: int) -> QdrantClient:
         client = QdrantClient(url=endpoint, api_key=api_key)
         
         # Check if collection exists
+        quantization = models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8,
+                always_ram=True,
+            )
+        )
         if not client.collection_exists(COLLECTION_NAME):
             logger.info(f"✨ Creating collection '{COLLECTION_NAME}' with vector size {vector_size}...")
             client.create_collection(
@@ -121,11 +192,17 @@ def init_qdrant(endpoint: str, api_key: str, vector_size: int) -> QdrantClient:
                 vectors_config=models.VectorParams(
                     size=vector_size,
                     distance=models.Distance.COSINE
-                )
+                ),
+                # Store vectors as int8 in RAM (4x smaller, faster SIMD scoring)
+                quantization_config=quantization,
             )
             logger.info("✅ Collection created successfully.")
         else:
             logger.info(f"ℹ️  Collection '{COLLECTION_NAME}' already exists.")
+            # Collections created before quantization was enabled get it applied in place
+            if client.get_collection(COLLECTION_NAME).config.quantization_config is None:
+                logger.info("🗜️  Enabling INT8 scalar quantization...")
+                client.update_collection(COLLECTION_NAME, quantization_config=quantization)
             
         return client
     except Exception as e:
@@ -152,7 +229,7 @@ def fetch_freepik_images(api_key: str, search_term: str, page: int = 1, limit: i
     }
     
     try:
-        response = requests.get(api_url, headers=headers, params=params)
+        response = SESSION.get(api_url, headers=headers, params=params, timeout=30)
         
         if response.status_code == 200:
             return response.json()
@@ -169,91 +246,516 @@ def fetch_freepik_images(api_key: str, search_term: str, page: int = 1, limit: i
         return None
 
 def download_image(url: str) -> Optional[Image.Image]:
-    """Download and convert image to RGB PIL Image."""
+    """
+    Download an image and decode it to an RGB PIL Image at PREVIEW_SIZE.
+    
+    The body is streamed and abandoned once it exceeds MAX_PREVIEW_BYTES, so
+    oversized previews never get fully downloaded or decoded.
+    """
     try:
-        response = requests.get(url, timeout=10)
-        if response.status_code == 200:
-            image = Image.open(BytesIO(response.content))
-            if image.mode != "RGB":
-                image = image.convert("RGB")
-            return image
-        return None
+        with SESSION.get(url, timeout=10, stream=True) as response:
+            if response.status_code != 200:
+                return None
+            
+            content_length = int(response.headers.get("Content-Length") or 0)
+            if content_length > MAX_PREVIEW_BYTES:
+                logger.debug(f"Skipping oversized preview ({content_length} bytes): {url}")
+                return None
+            
+            data = response.raw.read(MAX_PREVIEW_BYTES + 1, decode_content=True)
+            if len(data) > MAX_PREVIEW_BYTES:
+                logger.debug(f"Skipping oversized preview (>{MAX_PREVIEW_BYTES} bytes): {url}")
+                return None
+        
+        image = Image.open(BytesIO(data))
+        # Let libjpeg scale down during decode instead of decoding full size
+        image.draft("RGB", PREVIEW_SIZE)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        image.thumbnail(PREVIEW_SIZE, Image.BILINEAR)
+        return image
     except Exception as e:
         logger.warning(f"⚠️  Failed to download image: {e}")
         return None
 
-def analyze_image_with_gemini(image: Image.Image, search_term: str) -> Dict[str, Any]:
-    """
-    Analyze image using Gemini Vision to identify exact name and estimate price.
+def is_placeholder_image(image: Image.Image) -> bool:
+    """Return True for flat, near-black or near-white previews not worth analyzing."""
+    pixels = np.asarray(image.resize((32, 32)).convert("L"))
+    mean = pixels.mean()
+    return pixels.std() < MIN_PREVIEW_STD or mean < MIN_PREVIEW_MEAN or mean > MAX_PREVIEW_MEAN
+
+def prepare_clip_image(image: Image.Image) -> Image.Image:
     """
-    max_retries = 3
-    base_delay = 5
-    
-    for attempt in range(max_retries):
-        try:
-            # Use gemini-2.0-flash for better rate limits and speed
-            model = genai.GenerativeModel('gemini-2.0-flash')
-            
-            prompt = f"""
-            Analyze this landscaping image found with search term "{search_term}".
-            
-            1. Identify the EXACT specific plant species or hardscape material shown (e.g., "Acer palmatum" instead of just "maple").
-            2. Estimate the MINIMUM typical market price for this item in USD (e.g., "$50 per 5-gallon pot" or "$5 per sq ft"). Take the lower bound of any range.
-            
-            Return ONLY a JSON object with these keys:
-            - "specific_name": string (the specific name)
-            - "price_estimate": string (the minimum price with unit)
-            - "description": string (brief 1-sentence description of the visual)
-            """
-            
-            response = model.generate_content([prompt, image])
-            text = response.text.strip()
-            
-            # Extract JSON from response (handle markdown code blocks)
-            if "```json" in text:
-                text = text.split("```json")[1].split("```")[0].strip()
-            elif "```" in text:
-                text = text.split("```")[1].split("```")[0].strip()
-                
-            return json.loads(text)
-            
-        except Exception as e:
-            if "429" in str(e):
-                wait_time = base_delay * (2 ** attempt)
-                logger.warning(f"⚠️  Rate limit hit (attempt {attempt+1}/{max_retries}). Waiting {wait_time}s...")
-                time.sleep(wait_time)
-            else:
-                logger.warning(f"⚠️  Gemini analysis failed: {e}")
-                break
+    Resize and center-crop an image to CLIP's input size.
     
+    This matches FastEmbed's CLIP preprocessing (shortest-edge resize then
+    center crop), so its own resize/crop steps become no-ops and only
+    normalization remains at embed time.
+    """
+    return ImageOps.fit(image, CLIP_INPUT_SIZE, Image.BICUBIC)
+
+def parse_json_response(text: str) -> Dict[str, Any]:
+    """Parse a Gemini JSON response, falling back to stripping markdown fences."""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        match = JSON_BLOCK_RE.search(text)
+        if not match:
+            raise
+        return json.loads(match.group(1))
+
+def upload_image_to_gemini(image: Image.Image):
+    """Upload an image once to the Gemini Files API and return the file handle."""
+    with tempfile.NamedTemporaryFile(suffix=".jpg", delete=False) as tmp:
+        image.save(tmp, format="JPEG", quality=85)
+        tmp_path = tmp.name
+    try:
+        return genai.upload_file(tmp_path, mime_type="image/jpeg")
+    finally:
+        os.remove(tmp_path)
+
+def empty_analysis() -> Dict[str, Any]:
     return {
         "specific_name": "",
         "price_estimate": "",
         "description": ""
     }
 
-def upsert_batch(client: QdrantClient, model: ImageEmbedding, images: List[Image.Image], payloads: List[Dict]):
-    """Generate embeddings and upsert a batch of points."""
+def analyze_images_with_gemini(images: List[Image.Image], search_terms: List[str]) -> List[Dict[str, Any]]:
+    """
+    Analyze a batch of images with one Gemini Vision request to identify the
+    exact name and estimate the price of each.
+    
+    Images are uploaded to the Files API once and the same file handles are
+    reused on every retry, then deleted once the analysis is done. Returns one
+    analysis per image, in order (empty analyses on failure).
+    """
+    max_retries = 3
+    base_delay = 5
+    
+    image_files = []
     try:
-        # Generate embeddings
-        embeddings = list(model.embed(images))
+        for image in images:
+            image_files.append(upload_image_to_gemini(image))
+    except Exception as e:
+        logger.warning(f"⚠️  Gemini upload failed: {e}")
+        delete_gemini_files(image_files)
+        return [empty_analysis() for _ in images]
+    
+    try:
+        for attempt in range(max_retries):
+            try:
+                # Use gemini-2.0-flash for better rate limits and speed.
+                # Structured output guarantees a bare JSON array (no markdown fences).
+                model = genai.GenerativeModel(
+                    'gemini-2.0-flash',
+                    generation_config={
+                        "response_mime_type": "application/json",
+                        "response_schema": {"type": "array", "items": ANALYSIS_SCHEMA},
+                    },
+                )
+                
+                terms = "\n".join(f'{i}. "{term}"' for i, term in enumerate(search_terms, 1))
+                prompt = f"""
+                Analyze each of the {len(images)} numbered landscaping images below. They were found with these search terms:
+                {terms}
+                
+                Return a JSON array with exactly one object per image, in the same order, with:
+                - specific_name: the EXACT specific plant species or hardscape material shown (e.g., "Acer palmatum" instead of just "maple").
+                - price_estimate: the MINIMUM typical market price for this item in USD with unit (e.g., "$50 per 5-gallon pot" or "$5 per sq ft"). Take the lower bound of any range.
+                - description: brief 1-sentence description of the visual.
+                """
+                
+                contents = [prompt]
+                for i, image_file in enumerate(image_files, 1):
+                    contents.extend([f"Image {i}:", image_file])
+                
+                response = model.generate_content(contents)
+                analyses = parse_json_response(response.text)
+                if not isinstance(analyses, list):
+                    logger.warning(f"⚠️  Gemini returned a non-array response for {len(images)} images, discarding")
+                    break
+                if len(analyses) != len(images):
+                    logger.warning(f"⚠️  Gemini returned {len(analyses)} analyses for {len(images)} images, discarding")
+                    break
+                return analyses
+                
+            except Exception as e:
+                if "429" in str(e):
+                    wait_time = base_delay * (2 ** attempt)
+                    logger.warning(f"⚠️  Rate limit hit (attempt {attempt+1}/{max_retries}). Waiting {wait_time}s...")
+                    time.sleep(wait_time)
+                else:
+                    logger.warning(f"⚠️  Gemini analysis failed: {e}")
+                    break
+    finally:
+        delete_gemini_files(image_files)
+    
+    return [empty_analysis() for _ in images]
+
+def delete_gemini_files(image_files: List):
+    """Best-effort cleanup of uploaded Gemini files."""
+    for image_file in image_files:
+        try:
+            genai.delete_file(image_file.name)
+        except Exception as e:
+            logger.debug(f"Failed to delete Gemini file {image_file.name}: {e}")
+
+def point_id(payload: Dict[str, Any]) -> str:
+    """Derive a stable point ID from the Freepik asset ID (or image URL as a fallback)."""
+    key = payload.get("freepik_id") or payload["image_url"]
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, key))
+
+def searchable_text_lower(payload: Dict[str, Any]) -> str:
+    """Lower-cased text the RAG keyword search matches against (same format in update_plant_names)."""
+    return f"{payload.get('specific_name', '')} {payload.get('title', '')} {payload.get('description', '')}".lower()
+
+def upsert_batch(client: QdrantClient, model: ImageEmbedding, images: List[Image.Image], payloads: List[Dict]) -> bool:
+    """Generate embeddings and upsert a batch of points. Returns True on success."""
+    try:
+        ids = [point_id(payload) for payload in payloads]
+        for payload in payloads:
+            payload["searchable_text_lower"] = searchable_text_lower(payload)
         
-        points = [
-            models.PointStruct(
-                id=str(uuid.uuid4()),
-                vector=emb.tolist(),
-                payload=payload
-            )
-            for emb, payload in zip(embeddings, payloads)
-        ]
+        # Generate embeddings as a single (batch, dim) array in one model call
+        embeddings = np.vstack(list(model.embed(images, batch_size=len(images))))
 
         client.upsert(
             collection_name=COLLECTION_NAME,
-            points=points
+            points=models.Batch(ids=ids, vectors=embeddings, payloads=payloads),
+            wait=False,
         )
-        logger.info(f"✅ Upserted batch of {len(points)} images")
+        logger.info(f"✅ Upserted batch of {len(ids)} images")
+        return True
     except Exception as e:
         logger.error(f"❌ Error upserting batch: {e}")
+        return False
+
+class IngestState:
+    """
+    SQLite-backed ingestion checkpoint.
+    
+    Records the Freepik assets that have been upserted and the
+    (search_term, page) cursors whose items have all been processed.
+    """
+
+    def __init__(self, path: str):
+        # Written from several pipeline threads
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.conn.execute("CREATE TABLE IF NOT EXISTS ingested (freepik_id TEXT PRIMARY KEY)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages (search_term TEXT, page INTEGER, PRIMARY KEY (search_term, page))"
+        )
+        self.conn.commit()
+
+    def ingested_ids(self) -> set:
+        with self.lock:
+            return {row[0] for row in self.conn.execute("SELECT freepik_id FROM ingested")}
+
+    def completed_pages(self) -> set:
+        with self.lock:
+            return {(term, page) for term, page in self.conn.execute("SELECT search_term, page FROM pages")}
+
+    def mark_ingested(self, freepik_ids: List[str]):
+        with self.lock:
+            self.conn.executemany("INSERT OR IGNORE INTO ingested VALUES (?)", [(fid,) for fid in freepik_ids])
+            self.conn.commit()
+
+    def mark_page_done(self, cursor: tuple):
+        with self.lock:
+            self.conn.execute("INSERT OR IGNORE INTO pages VALUES (?, ?)", cursor)
+            self.conn.commit()
+
+class PageTracker:
+    """
+    Counts in-flight items per (search_term, page) cursor.
+    
+    A page is checkpointed once every item from it has been upserted or
+    dropped by a stage. Pages with items lost to an interrupted run stay
+    open and are fetched again on the next run.
+    """
+
+    def __init__(self, state: IngestState):
+        self.state = state
+        self.pending: Dict[tuple, int] = {}
+        self.lock = threading.Lock()
+
+    def open(self, cursor: tuple, count: int):
+        """Register a page before its `count` items are queued."""
+        if count == 0:
+            self.state.mark_page_done(cursor)
+            return
+        with self.lock:
+            self.pending[cursor] = count
+
+    def done(self, cursor: tuple):
+        """Mark one item from `cursor` as finished."""
+        with self.lock:
+            self.pending[cursor] -= 1
+            finished = self.pending[cursor] == 0
+            if finished:
+                del self.pending[cursor]
+        if finished:
+            self.state.mark_page_done(cursor)
+
+class UpsertWorker(threading.Thread):
+    """
+    Background thread that embeds and upserts completed batches.
+    
+    Upserts are sent with wait=False and the submit queue is bounded, so the
+    pipeline never blocks on Qdrant acknowledgements but cannot run far ahead
+    of the write path either.
+    """
+
+    def __init__(self, client: QdrantClient, model: ImageEmbedding, state: IngestState,
+                 tracker: PageTracker, maxsize: int = 4):
+        super().__init__(name="upsert", daemon=True)
+        self.client = client
+        self.model = model
+        self.state = state
+        self.tracker = tracker
+        self.batches = queue.Queue(maxsize=maxsize)
+
+    def submit(self, images: List[Image.Image], payloads: List[Dict], cursors: List[tuple]):
+        self.batches.put((images, payloads, cursors))
+
+    def run(self):
+        while True:
+            batch = self.batches.get()
+            if batch is STOP:
+                return
+            images, payloads, cursors = batch
+            if upsert_batch(self.client, self.model, images, payloads):
+                self.state.mark_ingested([p["freepik_id"] for p in payloads if p["freepik_id"]])
+                for cursor in cursors:
+                    self.tracker.done(cursor)
+
+    def close(self):
+        """Flush all queued batches and wait for the worker to finish."""
+        self.batches.put(STOP)
+        self.join()
+
+def build_payload(item: Dict, image_url: str, search_term: str) -> Dict[str, Any]:
+    """Build the Qdrant payload for a Freepik search result."""
+    payload = {
+        "freepik_id": str(item.get("id", "")),
+        "title": item.get("title", ""),
+        "url": item.get("url", ""),
+        "image_url": image_url,
+        "filename": item.get("filename", ""),
+        "search_term": search_term,
+        "content_type": item.get("image", {}).get("type", "photo"),
+        "orientation": item.get("image", {}).get("orientation", ""),
+        "premium": any(lic.get("type") == "premium" for lic in item.get("licenses", [])),
+        "source": "freepik",
+    }
+    
+    # Add optional fields if available
+    if "author" in item:
+        payload["author"] = item["author"].get("name", "")
+    
+    if "stats" in item:
+        payload["downloads"] = item["stats"].get("downloads", 0)
+        payload["likes"] = item["stats"].get("likes", 0)
+    
+    return payload
+
+# Sentinel marking the end of a pipeline stage's input
+STOP = object()
+
+def start_stage(name: str, handler, in_queue: queue.Queue, out_queue: queue.Queue,
+                num_workers: int, stop_event: threading.Event, tracker: PageTracker,
+                batch_size: int = 1):
+    """
+    Start `num_workers` threads applying `handler` to items from `in_queue`.
+    
+    Tasks are tuples ending in their (search_term, page) cursor. With
+    batch_size > 1 the handler receives a list of up to `batch_size` tasks
+    (whatever is already queued) and returns a list of results. Non-None
+    results are pushed to `out_queue`; dropped or failed tasks are marked done
+    on the tracker. When STOP arrives, each worker puts it back for its
+    siblings and exits; once all workers are done a single STOP is forwarded
+    downstream.
+    """
+    def worker():
+        while True:
+            task = in_queue.get()
+            if task is STOP:
+                in_queue.put(STOP)
+                return
+            tasks = [task]
+            while len(tasks) < batch_size:
+                try:
+                    task = in_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if task is STOP:
+                    in_queue.put(STOP)
+                    break
+                tasks.append(task)
+            if stop_event.is_set():
+                continue
+            try:
+                results = handler(tasks) if batch_size > 1 else [handler(tasks[0])]
+            except Exception as e:
+                logger.warning(f"⚠️  {name} worker failed: {e}")
+                results = [None] * len(tasks)
+            for task, result in zip(tasks, results):
+                if result is None:
+                    tracker.done(task[-1])
+                else:
+                    out_queue.put(result)
+
+    workers = [
+        threading.Thread(target=worker, name=f"{name}-{i}", daemon=True)
+        for i in range(num_workers)
+    ]
+    for t in workers:
+        t.start()
+
+    def close():
+        for t in workers:
+            t.join()
+        out_queue.put(STOP)
+
+    threading.Thread(target=close, name=f"{name}-close", daemon=True).start()
+
+class TokenBucket:
+    """Thread-safe token bucket used to share a request rate across workers."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then consume it."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+def fetch_term_pages(pool: ThreadPoolExecutor, freepik_key: str, search_term: str,
+                     bucket: TokenBucket, pages: List[int]):
+    """Fetch the given pages for a search term concurrently, yielding (page, items) as they complete."""
+    def fetch_page(page: int) -> Optional[Dict]:
+        bucket.acquire()
+        return fetch_freepik_images(freepik_key, search_term, page=page, limit=50)
+
+    futures = {pool.submit(fetch_page, page): page for page in pages}
+    try:
+        for future in as_completed(futures):
+            page = futures[future]
+            result = future.result()
+            if not result or "data" not in result:
+                logger.warning(f"⚠️  No results for '{search_term}' page {page}")
+                continue
+            yield page, result["data"]
+    finally:
+        for future in futures:
+            future.cancel()
+
+def search_producer(freepik_key: str, item_queue: queue.Queue, stop_event: threading.Event,
+                    seen_ids: set, completed_pages: set, tracker: PageTracker):
+    """
+    Walk every search term and page, pushing (item, cursor) tasks downstream.
+    
+    Terms are paginated by parallel workers that share one page pool and one
+    rate bucket, so the Freepik rate budget is spent on concurrent requests.
+    Pages in `completed_pages` were fully processed on a previous run and are
+    not fetched again. Assets already in `seen_ids` (ingested on a previous run,
+    or returned by an overlapping search term) are dropped before they are
+    downloaded.
+    """
+    bucket = TokenBucket(FREEPIK_RATE_LIMIT, capacity=PAGE_WORKERS)
+    seen_lock = threading.Lock()
+
+    def produce_term(search_term: str):
+        if stop_event.is_set():
+            return
+        
+        pages = [p for p in range(1, PAGES_PER_TERM + 1) if (search_term, p) not in completed_pages]
+        if not pages:
+            logger.info(f"⏭️  '{search_term}' already fully ingested")
+            return
+        
+        logger.info(f"🔍 Searching: '{search_term}'")
+        
+        try:
+            for page, items in fetch_term_pages(page_pool, freepik_key, search_term, bucket, pages):
+                if stop_event.is_set():
+                    break
+                
+                logger.info(f"  📄 '{search_term}' page {page}: {len(items)} items")
+                
+                new_items = []
+                for item in items:
+                    fid = str(item.get("id", ""))
+                    if fid:
+                        with seen_lock:
+                            if fid in seen_ids:
+                                continue
+                            seen_ids.add(fid)
+                    new_items.append(item)
+                
+                cursor = (search_term, page)
+                tracker.open(cursor, len(new_items))
+                for item in new_items:
+                    item_queue.put((item, cursor))
+        except Exception as e:
+            logger.error(f"❌ Search failed for '{search_term}': {e}")
+
+    try:
+        with ThreadPoolExecutor(max_workers=PAGE_WORKERS, thread_name_prefix="freepik-page") as page_pool, \
+                ThreadPoolExecutor(max_workers=TERM_WORKERS, thread_name_prefix="freepik-term") as term_pool:
+            list(term_pool.map(produce_term, SEARCH_TERMS))
+    finally:
+        item_queue.put(STOP)
+
+def download_task(task) -> Optional[tuple]:
+    """Pipeline stage: download the preview image for a search result."""
+    item, cursor = task
+    search_term = cursor[0]
+    
+    image_url = None
+    if "image" in item and "source" in item["image"]:
+        image_url = item["image"]["source"].get("url")
+    
+    if not image_url:
+        logger.warning("⚠️  No image URL found, skipping")
+        return None
+    
+    image = download_image(image_url)
+    if not image:
+        return None
+    
+    if is_placeholder_image(image):
+        logger.info(f"  ⏭️  Skipping blank/placeholder preview: {image_url}")
+        return None
+    
+    return image, build_payload(item, image_url, search_term), cursor
+
+def analyze_task(tasks: List[tuple]) -> List[tuple]:
+    """Pipeline stage: enrich a batch of payloads with one Gemini analysis request."""
+    images = [image for image, _, _ in tasks]
+    payloads = [payload for _, payload, _ in tasks]
+    logger.info(f"  🤖 Analyzing {len(images)} images with Gemini...")
+    analyses = analyze_images_with_gemini(images, [p["search_term"] for p in payloads])
+    for payload, analysis in zip(payloads, analyses):
+        payload.update(analysis)
+        logger.info(f"     Identified: {analysis.get('specific_name', 'N/A')} | Price: {analysis.get('price_estimate', 'N/A')}")
+    # Rate limit for Gemini (per worker)
+    time.sleep(1.0)
+    return tasks
 
 def main():
     parser = argparse.ArgumentParser(description="Ingest Freepik landscaping images with Gemini analysis")
@@ -271,7 +773,9 @@ def main():
     # Initialize Embedding Model
     logger.info("🧠 Loading FastEmbed CLIP vision model...")
     try:
-        embedding_model = ImageEmbedding(model_name="Qdrant/clip-ViT-B-32-vision")
+        providers = select_onnx_providers()
+        logger.info(f"⚡ ONNX providers: {', '.join(providers)}")
+        embedding_model = ImageEmbedding(model_name="Qdrant/clip-ViT-B-32-vision", providers=providers)
         vector_size = 512  # CLIP ViT-B/32 standard size
         logger.info(f"📏 Vector size: {vector_size}")
     except Exception as e:
@@ -280,106 +784,83 @@ def main():
 
     # Initialize Qdrant
     client = init_qdrant(endpoint, api_key, vector_size)
+    
+    state = IngestState(STATE_DB)
+    tracker = PageTracker(state)
+    seen_ids = state.ingested_ids()
+    completed_pages = state.completed_pages()
+    if seen_ids or completed_pages:
+        logger.info(
+            f"⏭️  Resuming: skipping {len(seen_ids)} ingested assets and "
+            f"{len(completed_pages)} completed pages (see {STATE_DB})"
+        )
+
+    # Wire up the pipeline: search -> download -> (Gemini) -> batch -> embed/upsert.
+    # Network-bound stages run concurrently; the main thread only assembles
+    # batches for the background upsert worker.
+    stop_event = threading.Event()
+    item_queue = queue.Queue(maxsize=QUEUE_SIZE)
+    image_queue = queue.Queue(maxsize=QUEUE_SIZE)
+    
+    threading.Thread(
+        target=search_producer,
+        args=(freepik_key, item_queue, stop_event, seen_ids, completed_pages, tracker),
+        name="search",
+        daemon=True,
+    ).start()
+    start_stage("download", download_task, item_queue, image_queue, DOWNLOAD_WORKERS, stop_event, tracker)
+    
+    if gemini_key:
+        analyzed_queue = queue.Queue(maxsize=QUEUE_SIZE)
+        start_stage(
+            "gemini", analyze_task, image_queue, analyzed_queue, GEMINI_WORKERS, stop_event, tracker,
+            batch_size=GEMINI_BATCH_SIZE,
+        )
+    else:
+        analyzed_queue = image_queue
+    
+    upserter = UpsertWorker(client, embedding_model, state, tracker)
+    upserter.start()
 
     # Processing Loop
     batch_images = []
     batch_payloads = []
+    batch_cursors = []
     total_processed = 0
     
     logger.info("⚙️  Fetching and processing images from Freepik...")
     
     try:
-        for search_term in SEARCH_TERMS:
-            if args.limit and total_processed >= args.limit:
+        while True:
+            if args.limit and (total_processed + len(batch_images)) >= args.limit:
                 logger.info(f"🛑 Reached limit of {args.limit} images.")
                 break
             
-            logger.info(f"🔍 Searching: '{search_term}'")
+            task = analyzed_queue.get()
+            if task is STOP:
+                break
             
-            # Fetch multiple pages for each search term
-            for page in range(1, 11):  # Get 10 pages per search term
-                if args.limit and total_processed >= args.limit:
-                    break
-                
-                # Rate limiting
-                time.sleep(RATE_LIMIT_DELAY)
-                
-                result = fetch_freepik_images(freepik_key, search_term, page=page, limit=50)
-                
-                if not result or "data" not in result:
-                    logger.warning(f"⚠️  No results for '{search_term}' page {page}")
-                    break
-                
-                items = result["data"]
-                if not items:
-                    break
-                
-                logger.info(f"  📄 Page {page}: {len(items)} items")
-                
-                for item in items:
-                    if args.limit and (total_processed + len(batch_images)) >= args.limit:
-                        break
-                    
-                    # Add optional fields if available
-                    image_url = None
-                    if "image" in item and "source" in item["image"]:
-                        image_url = item["image"]["source"].get("url")
-                    
-                    if not image_url:
-                        logger.warning("⚠️  No image URL found, skipping")
-                        continue
-                    
-                    # Download image
-                    image = download_image(image_url)
-                    if not image:
-                        continue
-                    
-                    # Prepare payload with metadata
-                    payload = {
-                        "freepik_id": str(item.get("id", "")),
-                        "title": item.get("title", ""),
-                        "url": item.get("url", ""),
-                        "image_url": image_url,
-                        "filename": item.get("filename", ""),
-                        "search_term": search_term,
-                        "content_type": item.get("image", {}).get("type", "photo"),
-                        "orientation": item.get("image", {}).get("orientation", ""),
-                        "premium": any(lic.get("type") == "premium" for lic in item.get("licenses", [])),
-                        "source": "freepik",
-                    }
-                    
-                    # Gemini Analysis
-                    if gemini_key:
-                        logger.info(f"  🤖 Analyzing image with Gemini...")
-                        analysis = analyze_image_with_gemini(image, search_term)
-                        payload.update(analysis)
-                        logger.info(f"     Identified: {analysis.get('specific_name', 'N/A')} | Price: {analysis.get('price_estimate', 'N/A')}")
-                        # Rate limit for Gemini
-                        time.sleep(1.0)
-                    
-                    # Add optional fields if available
-                    if "author" in item:
-                        payload["author"] = item["author"].get("name", "")
-                    
-                    if "stats" in item:
-                        payload["downloads"] = item["stats"].get("downloads", 0)
-                        payload["likes"] = item["stats"].get("likes", 0)
-                    
-                    batch_images.append(image)
-                    batch_payloads.append(payload)
-                    
-                    # Process batch when full
-                    if len(batch_images) >= BATCH_SIZE:
-                        upsert_batch(client, embedding_model, batch_images, batch_payloads)
-                        total_processed += len(batch_images)
-                        logger.info(f"📊 Total processed: {total_processed} images")
-                        batch_images = []
-                        batch_payloads = []
+            image, payload, cursor = task
+            batch_images.append(prepare_clip_image(image))
+            batch_payloads.append(payload)
+            batch_cursors.append(cursor)
+            
+            # Process batch when full
+            if len(batch_images) >= BATCH_SIZE:
+                upserter.submit(batch_images, batch_payloads, batch_cursors)
+                total_processed += len(batch_images)
+                logger.info(f"📊 Total processed: {total_processed} images")
+                batch_images = []
+                batch_payloads = []
+                batch_cursors = []
+        
+        stop_event.set()
 
         # Process remaining images
         if batch_images:
-            upsert_batch(client, embedding_model, batch_images, batch_payloads)
+            upserter.submit(batch_images, batch_payloads, batch_cursors)
             total_processed += len(batch_images)
+        upserter.close()
 
         logger.info(f"🎉 Ingestion complete! Total documents: {total_processed}")
         
@@ -388,13 +869,16 @@ def main():
         logger.info(f"📊 Collection '{COLLECTION_NAME}' now has {collection_info.points_count} points")
 
     except KeyboardInterrupt:
+        stop_event.set()
         logger.info("\n⚠️  Ingestion stopped by user.")
         if batch_images:
             logger.info("💾 Saving remaining batch...")
-            upsert_batch(client, embedding_model, batch_images, batch_payloads)
+            upserter.submit(batch_images, batch_payloads, batch_cursors)
             total_processed += len(batch_images)
+        upserter.close()
         logger.info(f"📊 Final count: {total_processed} images")
     except Exception as e:
+        stop_event.set()
         logger.error(f"❌ Unexpected error during processing: {e}")
         import traceback
         traceback.print_exc()
@@ -7,18 +7,26 @@ and upsert them into a Qdrant collection.
 from __future__ import annotations
 
 import argparse
+import functools
 import hashlib
 import itertools
 import logging
 import os
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Iterable, Iterator, List
+import queue
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datasets import IterableDataset, load_dataset  # type: ignore
 from dotenv import load_dotenv
 from fastembed import ImageEmbedding
-from PIL import Image  # type: ignore
+from PIL import Image, ImageOps  # type: ignore
 from qdrant_client import QdrantClient
 from qdrant_client.http.models import Distance, PointStruct, VectorParams
 
@@ -27,10 +35,116 @@ DATASET_REPO = "crossingminds/shopping-queries-image-dataset"
 DATASET_SPLIT = "train"
 DEFAULT_COLLECTION = "shopping-queries-images"
 DEFAULT_LIMIT = 100
-DEFAULT_BATCH_SIZE = 32  # Increased from 16 for better throughput
+DEFAULT_BATCH_SIZE = 64  # Embedding batch size (FastEmbed)
+DEFAULT_DOWNLOAD_WINDOW = 256  # Samples downloaded per parallel fetch
 DEFAULT_MODEL = "Qdrant/clip-ViT-B-32-vision"
 DEFAULT_DOWNLOAD_WORKERS = 10
 DEFAULT_DOWNLOAD_TIMEOUT = 10
+DEFAULT_PREFETCH_BATCHES = 2
+DEFAULT_GRPC_PORT = 6334
+DEFAULT_QDRANT_TIMEOUT = 60  # Seconds; long enough that busy batches aren't retried
+DEFAULT_IMAGE_CACHE_DIR = ".img_cache"
+DEFAULT_IMAGE_CACHE_GB = 20
+DEFAULT_PROVIDERS = "auto"
+DEFAULT_FASTEMBED_CACHE = "./.fastembed_cache"
+DECODE_SIZE = (256, 256)  # Smallest JPEG draft size to decode (CLIP input is 224)
+CLIP_INPUT_SIZE = (224, 224)  # Input resolution of the supported image models
+
+_END_OF_STREAM = object()
+
+# Output dimensions of known FastEmbed models, so no probe download is needed
+KNOWN_VECTOR_SIZES = {
+    "Qdrant/clip-ViT-B-32-vision": 512,
+    "Qdrant/resnet50-onnx": 2048,
+    "Qdrant/Unicom-ViT-B-32": 512,
+    "Qdrant/Unicom-ViT-B-16": 768,
+}
+
+
+def make_session(pool_size: int = DEFAULT_DOWNLOAD_WORKERS) -> requests.Session:
+    """Build a keep-alive session so repeated CDN hosts reuse TCP/TLS connections."""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size * 2,
+        max_retries=Retry(
+            total=2,
+            backoff_factor=0.2,
+            status_forcelist=[429, 500, 502, 503, 504],
+        ),
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+_SESSION = make_session()
+
+
+class ImageCache:
+    """
+    Bounded on-disk cache of raw image bytes, keyed by a hash of the URL.
+
+    Re-runs (model upgrades, parameter sweeps) read images from disk instead
+    of the CDN. When the cache grows past `size_limit` bytes, the least
+    recently written files are removed until it is back under 90% of it.
+    """
+
+    def __init__(self, root: str, size_limit: int) -> None:
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.size_limit = size_limit
+        self._lock = threading.Lock()
+        self._size = sum(f.stat().st_size for f in self._files())
+
+    def _files(self) -> Iterator[Path]:
+        """Committed cache entries (in-flight `*.tmp` writes excluded)."""
+        return (f for f in self.root.glob("*/*") if f.is_file() and f.suffix != ".tmp")
+
+    def _path(self, url: str) -> Path:
+        key = hashlib.blake2b(url.encode(), digest_size=16).hexdigest()
+        return self.root / key[:2] / key
+
+    def get(self, url: str) -> bytes | None:
+        try:
+            return self._path(url).read_bytes()
+        except OSError:
+            return None
+
+    def put(self, url: str, body: bytes) -> None:
+        path = self._path(url)
+        path.parent.mkdir(exist_ok=True)
+        tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp.write_bytes(body)
+        with self._lock:
+            try:
+                old_size = path.stat().st_size
+            except OSError:
+                old_size = 0
+            os.replace(tmp, path)
+            self._size += len(body) - old_size
+            if self._size > self.size_limit:
+                self._evict()
+
+    def _evict(self) -> None:
+        files = sorted(
+            self._files(),
+            key=lambda f: f.stat().st_mtime,
+        )
+        target = int(self.size_limit * 0.9)
+        for f in files:
+            if self._size <= target:
+                break
+            try:
+                size = f.stat().st_size
+                f.unlink()
+                self._size -= size
+            except OSError:
+                continue
+
+
+# Set from main(); None disables the on-disk image cache
+_IMAGE_CACHE: ImageCache | None = None
 
 
 def require_env(key: str) -> str:
@@ -52,11 +166,93 @@ def batched(iterable: Iterable[dict], size: int) -> Iterator[List[dict]]:
 
 
 def normalize_image(image: Image.Image) -> Image.Image:
+    """
+    Decode an image once, as RGB, at roughly the size CLIP needs.
+
+    draft() lets libjpeg scale down by 1/2-1/8 and colour-convert during the
+    DCT decode (no-op for other formats); the embedding model resizes to
+    224x224 anyway, so nothing it uses is lost.
+    """
+    image.draft("RGB", DECODE_SIZE)
     if image.mode != "RGB":
         return image.convert("RGB")
+    image.load()
     return image
 
 
+def select_providers(requested: str = DEFAULT_PROVIDERS) -> List[str]:
+    """
+    Resolve the --providers flag to ONNX Runtime execution providers.
+    "auto" picks CUDA when the installed onnxruntime supports it, then CPU.
+    """
+    if requested != "auto":
+        return [p.strip() for p in requested.split(",") if p.strip()]
+    import onnxruntime as ort  # type: ignore
+
+    available = set(ort.get_available_providers())
+    return [p for p in ("CUDAExecutionProvider", "CPUExecutionProvider") if p in available]
+
+
+def quantize_model(model_name: str) -> str:
+    """
+    Build (once) an INT8 dynamically-quantized copy of a FastEmbed ONNX model.
+
+    Qdrant's model zoo has no INT8 CLIP vision variant, so the FP32 weights are
+    quantized locally with onnxruntime. Matmuls read half the memory and CPU
+    embedding runs roughly 2x faster, for about a 1% recall drop on cosine
+    search. Returns the directory to pass as `specific_model_path`.
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic  # type: ignore
+
+    cache = Path(DEFAULT_FASTEMBED_CACHE)
+    quant_dir = cache / "int8" / model_name.replace("/", "__")
+    if (quant_dir / "model.onnx").exists():
+        return str(quant_dir)
+
+    # Make sure the FP32 snapshot is downloaded, then copy its configs alongside
+    ImageEmbedding(model_name=model_name, cache_dir=str(cache))
+    pattern = f"models--{model_name.replace('/', '--')}/snapshots/*/model.onnx"
+    source = next(cache.glob(pattern), None)
+    if source is None:
+        raise FileNotFoundError(f"Could not find ONNX weights for {model_name} in {cache}")
+
+    logging.info("Quantizing %s to INT8 (one-time)...", model_name)
+    shutil.copytree(source.parent, quant_dir, dirs_exist_ok=True)
+    quantize_dynamic(str(source), str(quant_dir / "model.onnx"), weight_type=QuantType.QInt8)
+    return str(quant_dir)
+
+
+@functools.lru_cache(maxsize=None)
+def load_model(
+    model_name: str,
+    providers: Tuple[str, ...],
+    quantize: bool = False,
+) -> ImageEmbedding:
+    """
+    Load (once per process) a FastEmbed image model using every CPU core,
+    and warm it up so the first real batch doesn't pay for ORT graph setup.
+    """
+    model = ImageEmbedding(
+        model_name=model_name,
+        threads=os.cpu_count(),
+        providers=list(providers),
+        cache_dir=DEFAULT_FASTEMBED_CACHE,
+        specific_model_path=quantize_model(model_name) if quantize else None,
+    )
+    list(model.embed([Image.new("RGB", (224, 224))], batch_size=1))
+    return model
+
+
+def prepare_image(image: Image.Image) -> Image.Image:
+    """
+    Decode and resize/center-crop an image to the model's input size.
+
+    This matches FastEmbed's CLIP preprocessing (shortest-edge resize then
+    center crop), so its own resize/crop steps become no-ops at embed time.
+    """
+    return ImageOps.fit(normalize_image(image), CLIP_INPUT_SIZE, Image.BICUBIC)
+
+
 def ensure_collection(client: QdrantClient, name: str, vector_size: int) -> None:
     collections = {c.name for c in client.get_collections().collections}
     if name in collections:
@@ -78,7 +274,11 @@ def iter_samples(limit: int) -> Iterable[dict]:
     return itertools.islice(dataset, limit)
 
 
-def download_image(url: str, timeout: int = 10) -> Image.Image | None:
+def download_image(
+    url: str,
+    timeout: int = 10,
+    session: requests.Session | None = None,
+) -> Image.Image | None:
     """
     Download an image from a URL and return as PIL Image.
     
@@ -89,10 +289,16 @@ def download_image(url: str, timeout: int = 10) -> Image.Image | None:
     if not url:
         return None
     try:
-        # Use session for connection pooling
-        response = requests.get(url, timeout=timeout, stream=True)
-        response.raise_for_status()
-        return Image.open(response.raw)
+        body = _IMAGE_CACHE.get(url) if _IMAGE_CACHE else None
+        if body is None:
+            # Use session for connection pooling
+            response = (session or _SESSION).get(url, timeout=timeout, stream=True)
+            response.raise_for_status()
+            # Read the body up front so PIL's lazy decoder never stalls on the socket
+            body = response.content
+            if _IMAGE_CACHE:
+                _IMAGE_CACHE.put(url, body)
+        return Image.open(BytesIO(body))
     except Exception as exc:  # noqa: BLE001
         logging.debug("Failed to download image from %s: %s", url[:80], exc)
         return None
@@ -102,31 +308,126 @@ def download_images_parallel(
     urls: List[str],
     max_workers: int = 10,
     timeout: int = 10,
+    session: requests.Session | None = None,
+    transform: Callable[[Image.Image], Image.Image] | None = None,
 ) -> List[Image.Image | None]:
     """
     Download multiple images in parallel using ThreadPoolExecutor.
     Returns a list of PIL Images or None for failed downloads.
+    All workers share one pooled session (the module default unless given).
+    Repeated URLs (common across product variants) are fetched only once.
+    `transform` runs on the worker threads, so decoding and resizing happen
+    in parallel too (PIL releases the GIL while doing both).
     """
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_to_url = {executor.submit(download_image, url, timeout): url for url in urls}
-        results = [None] * len(urls)
-        url_to_index = {url: i for i, url in enumerate(urls)}
-        
-        for future in as_completed(future_to_url):
-            url = future_to_url[future]
-            try:
-                img = future.result()
-                results[url_to_index[url]] = img
-            except Exception as exc:
-                logging.debug("Failed to download %s: %s", url[:80], exc)
-                results[url_to_index[url]] = None
-        
-        return results
+    session = session or _SESSION
+
+    def fetch(url: str) -> Image.Image | None:
+        try:
+            image = download_image(url, timeout, session)
+            if image is not None and transform is not None:
+                image = transform(image)
+            return image
+        except Exception as exc:  # noqa: BLE001
+            logging.debug("Failed to download %s: %s", url[:80], exc)
+            return None
+
+    unique_urls = list(dict.fromkeys(urls))
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="img-dl") as executor:
+        by_url = dict(zip(unique_urls, executor.map(fetch, unique_urls)))
+    # Fan the results back out to every occurrence, in input order
+    return [by_url[url] for url in urls]
 
 
 def product_id_to_int(product_id: str) -> int:
-    """Convert product_id string to a consistent integer ID."""
-    return int(hashlib.md5(product_id.encode()).hexdigest()[:8], 16)
+    """Convert product_id string to a consistent 63-bit integer ID."""
+    digest = hashlib.blake2b(product_id.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") & ((1 << 63) - 1)
+
+
+def download_batch(
+    batch: List[dict],
+    download_workers: int = 10,
+    download_timeout: int = 10,
+) -> Tuple[List[dict], List[Image.Image]]:
+    """
+    Download the images for one batch of samples in parallel.
+    Returns point payloads for the samples whose image downloaded, alongside
+    their decoded, model-sized images.
+    """
+    # Read each sample's URL once and keep it with the sample
+    pairs = [(item, url) for item in batch if (url := item.get("image_url"))]
+    if not pairs:
+        return [], []
+    valid_samples, image_urls = zip(*pairs)
+
+    downloaded_images = download_images_parallel(
+        list(image_urls),
+        max_workers=download_workers,
+        timeout=download_timeout,
+        transform=prepare_image,
+    )
+
+    # Filter out None (failed downloads and undecodable images)
+    payloads: List[dict] = []
+    images: List[Image.Image] = []
+    for img, sample_item, image_url in zip(downloaded_images, valid_samples, image_urls):
+        if img:
+            images.append(img)
+            payloads.append({
+                "product_id": sample_item.get("product_id", ""),
+                "image_url": image_url,
+            })
+    return payloads, images
+
+
+def prefetch_batches(
+    samples: Iterable[dict],
+    batch_size: int,
+    prefetch: int = DEFAULT_PREFETCH_BATCHES,
+    download_workers: int = 10,
+    download_timeout: int = 10,
+) -> Iterator[Tuple[List[dict], List[Image.Image]]]:
+    """
+    Download sample batches on a background thread, up to `prefetch` batches ahead.
+
+    The next batch's images are fetched while the caller embeds the current one,
+    so the network and the embedding model are busy at the same time.
+    """
+    ready: queue.Queue = queue.Queue(maxsize=max(1, prefetch))
+    stop = threading.Event()
+
+    def put(item: object) -> bool:
+        while not stop.is_set():
+            try:
+                ready.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def producer() -> None:
+        try:
+            for batch in batched(samples, batch_size):
+                if not put(download_batch(batch, download_workers, download_timeout)):
+                    return
+        except Exception as exc:  # noqa: BLE001
+            put(exc)
+            return
+        put(_END_OF_STREAM)
+
+    downloader = threading.Thread(target=producer, name="img-prefetch", daemon=True)
+    downloader.start()
+    try:
+        while True:
+            item = ready.get()
+            if item is _END_OF_STREAM:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # Unblock the downloader if the consumer stops early
+        stop.set()
 
 
 def generate_points(
@@ -136,112 +437,59 @@ def generate_points(
     total_items: int | None = None,
     download_workers: int = 10,
     download_timeout: int = 10,
+    prefetch: int = DEFAULT_PREFETCH_BATCHES,
+    download_window: int = DEFAULT_DOWNLOAD_WINDOW,
 ) -> Iterator[PointStruct]:
     """
     Generator that yields PointStruct objects as we process samples.
     This allows streaming ingestion without loading everything into memory.
     
-    Uses parallel image downloads to speed up processing.
+    Image downloads run on a background thread (see prefetch_batches) so they
+    overlap with embedding; the embedding itself stays on the calling thread.
+    Images are fetched `download_window` samples at a time and embedded in
+    smaller chunks of `embedding_batch_size`.
     """
     from tqdm import tqdm
     
-    batch: List[dict] = []
-    processed = 0
-    progress = tqdm(total=total_items, desc="Processing images", unit="images", leave=True) if total_items else None
-    
-    for sample in samples:
-        batch.append(sample)
-        if len(batch) < embedding_batch_size:
-            continue
-        
-        # Process batch - download images in parallel
-        valid_samples: List[dict] = []
-        image_urls: List[str] = []
-        for item in batch:
-            image_url = item.get("image_url")
-            if image_url:
-                valid_samples.append(item)
-                image_urls.append(image_url)
-        
-        if image_urls:
-            # Download images in parallel
-            downloaded_images = download_images_parallel(
-                image_urls,
-                max_workers=download_workers,
-                timeout=download_timeout,
+    progress = (
+        tqdm(
+            total=total_items,
+            desc="Processing images",
+            unit="images",
+            leave=True,
+            mininterval=0.5,
+        )
+        if total_items
+        else None
+    )
+
+    def _process_batch(payloads: List[dict], images: List[Image.Image]) -> Iterator[PointStruct]:
+        # Generate embeddings
+        embeddings = model.embed(images, batch_size=embedding_batch_size)
+        # Yield points
+        for payload, emb in zip(payloads, embeddings):
+            # upload_points re-validates each point when it builds the request, so
+            # skip pydantic here. Vectors stay plain lists: passing the ndarray
+            # makes validation walk it element by element, and the gRPC
+            # converter only accepts lists.
+            yield PointStruct.model_construct(
+                id=product_id_to_int(payload["product_id"]),
+                vector=emb.tolist(),
+                payload=payload,
             )
-            
-            # Filter out None (failed downloads) and normalize
-            images: List[Image.Image] = []
-            successful_samples: List[dict] = []
-            for img, sample_item in zip(downloaded_images, valid_samples):
-                if img:
-                    images.append(normalize_image(img))
-                    successful_samples.append(sample_item)
-            
-            if images:
-                # Generate embeddings
-                embeddings = list(model.embed(images, batch_size=embedding_batch_size))
-                # Yield points
-                for sample_item, emb in zip(successful_samples, embeddings):
-                    product_id = sample_item.get("product_id", "")
-                    processed += 1
-                    if progress:
-                        progress.update(1)
-                        progress.set_postfix(processed=processed)
-                    yield PointStruct(
-                        id=product_id_to_int(product_id),
-                        vector=emb.tolist(),
-                        payload={
-                            "product_id": product_id,
-                            "image_url": sample_item.get("image_url"),
-                        },
-                    )
-        
-        batch = []
     
-    # Process remaining items
-    if batch:
-        valid_samples = []
-        image_urls = []
-        for item in batch:
-            image_url = item.get("image_url")
-            if image_url:
-                valid_samples.append(item)
-                image_urls.append(image_url)
-        
-        if image_urls:
-            # Download images in parallel
-            downloaded_images = download_images_parallel(
-                image_urls,
-                max_workers=download_workers,
-                timeout=download_timeout,
-            )
-            
-            # Filter out None (failed downloads) and normalize
-            images = []
-            successful_samples = []
-            for img, sample_item in zip(downloaded_images, valid_samples):
-                if img:
-                    images.append(normalize_image(img))
-                    successful_samples.append(sample_item)
-            
-            if images:
-                embeddings = list(model.embed(images, batch_size=embedding_batch_size))
-                for sample_item, emb in zip(successful_samples, embeddings):
-                    product_id = sample_item.get("product_id", "")
-                    processed += 1
-                    if progress:
-                        progress.update(1)
-                        progress.set_postfix(processed=processed)
-                    yield PointStruct(
-                        id=product_id_to_int(product_id),
-                        vector=emb.tolist(),
-                        payload={
-                            "product_id": product_id,
-                            "image_url": sample_item.get("image_url"),
-                        },
-                    )
+    for payloads, images in prefetch_batches(
+        samples,
+        max(download_window, embedding_batch_size),
+        prefetch=prefetch,
+        download_workers=download_workers,
+        download_timeout=download_timeout,
+    ):
+        for start in range(0, len(images), embedding_batch_size):
+            chunk = payloads[start:start + embedding_batch_size]
+            yield from _process_batch(chunk, images[start:start + embedding_batch_size])
+            if progress:
+                progress.update(len(chunk))
     
     if progress:
         progress.close()
@@ -259,6 +507,8 @@ def ingest_with_upload_points(
     total_items: int | None = None,
     download_workers: int = 10,
     download_timeout: int = 10,
+    prefetch: int = DEFAULT_PREFETCH_BATCHES,
+    download_window: int = DEFAULT_DOWNLOAD_WINDOW,
 ) -> None:
     """
     Use upload_points for efficient large-scale ingestion.
@@ -271,21 +521,22 @@ def ingest_with_upload_points(
     """
     # Determine vector size if not provided
     if vector_size is None:
-        # Convert to list to peek at first sample without consuming iterator
-        samples_list = list(samples)
-        if not samples_list:
+        vector_size = KNOWN_VECTOR_SIZES.get(getattr(model, "model_name", ""))
+    if vector_size is None:
+        # Peek at the first sample only, then put it back in front of the stream
+        samples_iter = iter(samples)
+        first_sample = next(samples_iter, None)
+        if first_sample is None:
             raise ValueError("No samples to process")
         
         # Process first sample to get vector size
-        first_sample = samples_list[0]
         img = download_image(first_sample.get("image_url", ""))
         if not img:
             raise ValueError("Failed to get sample image")
         test_emb = list(model.embed([normalize_image(img)], batch_size=1))[0]
         vector_size = len(test_emb)
         
-        # Use the full list as samples
-        samples = iter(samples_list)
+        samples = itertools.chain([first_sample], samples_iter)
     
     # Ensure collection exists
     ensure_collection(client, collection_name, vector_size)
@@ -298,6 +549,8 @@ def ingest_with_upload_points(
         total_items=total_items,
         download_workers=download_workers,
         download_timeout=download_timeout,
+        prefetch=prefetch,
+        download_window=download_window,
     )
     
     # Use upload_points for efficient streaming upload with PointStruct objects
@@ -331,6 +584,12 @@ def main() -> None:
         default=DEFAULT_BATCH_SIZE,
         help="Embedding batch size (for FastEmbed)",
     )
+    parser.add_argument(
+        "--download-window",
+        type=int,
+        default=DEFAULT_DOWNLOAD_WINDOW,
+        help=f"Samples to download per parallel fetch, independent of the embedding batch (default: {DEFAULT_DOWNLOAD_WINDOW})",
+    )
     parser.add_argument(
         "--upload-batch-size",
         type=int,
@@ -355,11 +614,57 @@ def main() -> None:
         default=10,
         help="Image download timeout in seconds (default: 10)",
     )
+    parser.add_argument(
+        "--prefetch-batches",
+        type=int,
+        default=DEFAULT_PREFETCH_BATCHES,
+        help=f"Batches to download ahead of embedding (default: {DEFAULT_PREFETCH_BATCHES})",
+    )
     parser.add_argument(
         "--model-name",
         default=os.getenv("EMBEDDING_MODEL", DEFAULT_MODEL),
         help="FastEmbed model to use for image embeddings",
     )
+    parser.add_argument(
+        "--providers",
+        default=DEFAULT_PROVIDERS,
+        help="Comma-separated ONNX Runtime providers, or 'auto' for CUDA when available then CPU",
+    )
+    parser.add_argument(
+        "--quantize",
+        action="store_true",
+        help="Embed with an INT8-quantized copy of the model (~2x faster on CPU, ~1%% recall drop)",
+    )
+    parser.add_argument(
+        "--image-cache-dir",
+        default=DEFAULT_IMAGE_CACHE_DIR,
+        help=f"On-disk cache for downloaded image bytes (default: {DEFAULT_IMAGE_CACHE_DIR})",
+    )
+    parser.add_argument(
+        "--image-cache-gb",
+        type=float,
+        default=DEFAULT_IMAGE_CACHE_GB,
+        help=f"Size limit of the image cache in GB (default: {DEFAULT_IMAGE_CACHE_GB})",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always download images instead of using the on-disk cache",
+    )
+    transport = parser.add_mutually_exclusive_group()
+    transport.add_argument(
+        "--grpc",
+        dest="grpc",
+        action="store_true",
+        default=True,
+        help="Upload over gRPC (default; much cheaper than JSON for bulk vectors)",
+    )
+    transport.add_argument(
+        "--rest",
+        dest="grpc",
+        action="store_false",
+        help="Upload over REST/JSON instead of gRPC",
+    )
     parser.add_argument(
         "--log-level",
         default="INFO",
@@ -371,12 +676,23 @@ def main() -> None:
     logging.basicConfig(level=getattr(logging, args.log_level.upper()))
     load_dotenv()
 
+    if not args.no_cache:
+        global _IMAGE_CACHE
+        _IMAGE_CACHE = ImageCache(args.image_cache_dir, int(args.image_cache_gb * 1024**3))
+
     qdrant_url = require_env("QDRANT_URL")
     qdrant_api_key = require_env("QDRANT_API_KEY")
 
-    logging.info("Loading FastEmbed model '%s'...", args.model_name)
-    model = ImageEmbedding(model_name=args.model_name)
-    client = QdrantClient(url=qdrant_url, api_key=qdrant_api_key)
+    providers = select_providers(args.providers)
+    logging.info("Loading FastEmbed model '%s' (providers: %s)...", args.model_name, ", ".join(providers))
+    model = load_model(args.model_name, tuple(providers), args.quantize)
+    client = QdrantClient(
+        url=qdrant_url,
+        api_key=qdrant_api_key,
+        prefer_grpc=args.grpc,
+        grpc_port=DEFAULT_GRPC_PORT,
+        timeout=DEFAULT_QDRANT_TIMEOUT,
+    )
     
     samples = iter_samples(args.limit)
     
@@ -395,6 +711,8 @@ def main() -> None:
         total_items=args.limit,
         download_workers=args.download_workers,
         download_timeout=args.download_timeout,
+        prefetch=args.prefetch_batches,
+        download_window=args.download_window,
     )
     
     # Get final count
@@ -14,14 +14,16 @@ Collection: plant-knowledge
 """
 
 import os
-import uuid
+import hashlib
 import logging
 import argparse
-from typing import List, Dict, Any
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List
 from dotenv import load_dotenv
 from qdrant_client import QdrantClient
 from qdrant_client.http import models
-from datasets import load_dataset
+from datasets import load_dataset, load_from_disk
 from fastembed import TextEmbedding
 
 # ==========================================
@@ -30,7 +32,22 @@ from fastembed import TextEmbedding
 DEFAULT_COLLECTION_NAME = "plant-knowledge"
 DEFAULT_DATASET_NAME = "KisanVaani/agriculture-qa-english-only"
 DEFAULT_BATCH_SIZE = 50
+DEFAULT_UPLOAD_BATCH_SIZE = 256
+DEFAULT_PARALLEL = 4
 DEFAULT_LIMIT = 1000  # Set to None to ingest entire dataset
+MAP_BATCH_SIZE = 1000
+PARALLEL_MAP_MIN_ROWS = 50_000  # Below this, worker start-up outweighs the gain
+
+# Candidate field names, in priority order, across Q&A dataset schemas
+QUESTION_FIELDS = ("question", "query", "text", "input")
+ANSWER_FIELDS = ("answer", "answers", "response", "output", "completion")
+CATEGORY_FIELDS = ("category", "topic", "label")
+
+DEFAULT_GRPC_PORT = 6334
+DEFAULT_QDRANT_TIMEOUT = 60  # Seconds; long enough that busy batches aren't retried
+DEFAULT_PROVIDERS = "auto"
+DEFAULT_FASTEMBED_CACHE = "./.fastembed_cache"
+DEFAULT_CACHE_ROOT = ".dataset_cache"  # Local save_to_disk copies, keyed by dataset name
 
 # Setup logging
 logging.basicConfig(
@@ -58,10 +75,35 @@ def load_environment():
     return endpoint, api_key
 
 
-def init_qdrant(endpoint: str, api_key: str, collection_name: str, vector_size: int) -> QdrantClient:
+def select_providers(requested: str = DEFAULT_PROVIDERS) -> List[str]:
+    """
+    Resolve the --providers flag to ONNX Runtime execution providers.
+    "auto" picks CUDA when the installed onnxruntime supports it, then CPU.
+    """
+    if requested != "auto":
+        return [p.strip() for p in requested.split(",") if p.strip()]
+    import onnxruntime as ort
+    
+    available = set(ort.get_available_providers())
+    return [p for p in ("CUDAExecutionProvider", "CPUExecutionProvider") if p in available]
+
+
+def init_qdrant(
+    endpoint: str,
+    api_key: str,
+    collection_name: str,
+    vector_size: int,
+    prefer_grpc: bool = True,
+) -> QdrantClient:
     """Initialize Qdrant client and create collection if needed."""
     try:
-        client = QdrantClient(url=endpoint, api_key=api_key)
+        client = QdrantClient(
+            url=endpoint,
+            api_key=api_key,
+            prefer_grpc=prefer_grpc,
+            grpc_port=DEFAULT_GRPC_PORT,
+            timeout=DEFAULT_QDRANT_TIMEOUT,
+        )
         
         # Check if collection exists
         if not client.collection_exists(collection_name):
@@ -83,69 +125,157 @@ def init_qdrant(endpoint: str, api_key: str, collection_name: str, vector_size:
         exit(1)
 
 
-def upsert_batch(
-    client: QdrantClient,
-    collection_name: str,
-    model: TextEmbedding,
-    texts: List[str],
-    payloads: List[Dict]
-):
-    """Generate embeddings and upsert a batch of points."""
-    try:
-        # Generate embeddings for questions
-        embeddings = list(model.embed(texts))
-        
-        points = [
-            models.PointStruct(
-                id=str(uuid.uuid4()),
-                vector=emb.tolist(),
-                payload=payload
-            )
-            for emb, payload in zip(embeddings, payloads)
-        ]
+def qa_point_id(question: str, answer: str) -> int:
+    """Deterministic 63-bit point ID for a Q&A pair, so re-runs overwrite instead of duplicating."""
+    digest = hashlib.blake2b(f"{question}\n{answer}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") & ((1 << 63) - 1)
 
-        client.upsert(
-            collection_name=collection_name,
-            points=points
-        )
-    except Exception as e:
-        logger.error(f"❌ Error upserting batch: {e}")
-        raise
+
+def _first_non_empty(batch: Dict[str, List], keys: tuple, n: int, default: Any) -> List:
+    """Per row, the first value among `keys` columns that isn't None or "" (column-oriented)."""
+    columns = [batch[key] for key in keys if key in batch]
+    return [
+        next((col[i] for col in columns if col[i] is not None and col[i] != ""), default)
+        for i in range(n)
+    ]
 
 
-def extract_qa_pair(item: Dict) -> tuple[str, str, str]:
+def extract_qa_batch(batch: Dict[str, List]) -> Dict[str, List]:
     """
-    Extract question, answer, and category from dataset item.
+    Extract question, answer, and category columns from a batch of dataset rows.
     Handles different dataset schemas flexibly.
+
+    Works on Arrow's column-oriented dict-of-lists, for use with
+    `dataset.map(batched=True)`; results land in the qa_* columns.
     """
-    # Try different field names for question
-    question = (
-        item.get('question') or 
-        item.get('query') or 
-        item.get('text') or 
-        item.get('input') or
-        ""
-    )
-    
-    # Try different field names for answer
-    answer = (
-        item.get('answer') or 
-        item.get('answers') or 
-        item.get('response') or 
-        item.get('output') or
-        item.get('completion') or
-        ""
-    )
-    
-    # Try to extract category/topic
-    category = (
-        item.get('category') or 
-        item.get('topic') or 
-        item.get('label') or
-        "general"
+    n = len(next(iter(batch.values()))) if batch else 0
+    questions = _first_non_empty(batch, QUESTION_FIELDS, n, "")
+    answers = _first_non_empty(batch, ANSWER_FIELDS, n, "")
+    return {
+        "qa_question": [q.strip() if isinstance(q, str) else "" for q in questions],
+        "qa_answer": [a.strip() if isinstance(a, str) else "" for a in answers],
+        # Class-label columns hold ints (0 included); keep the column a single string type for Arrow
+        "qa_category": [str(c) for c in _first_non_empty(batch, CATEGORY_FIELDS, n, "general")],
+    }
+
+
+def add_qa_columns(dataset, streaming: bool = False):
+    """
+    Run extract_qa_batch over the whole dataset with Hugging Face's batched map.
+
+    Large non-streaming datasets are split across all CPU cores; the mapped
+    result is cached next to the dataset, so re-runs skip the extraction.
+    """
+    if streaming:
+        return dataset.map(extract_qa_batch, batched=True, batch_size=MAP_BATCH_SIZE)
+    num_proc = os.cpu_count() if len(dataset) >= PARALLEL_MAP_MIN_ROWS else None
+    return dataset.map(
+        extract_qa_batch,
+        batched=True,
+        batch_size=MAP_BATCH_SIZE,
+        num_proc=num_proc,
+        desc="Extracting Q&A pairs",
     )
+
+
+def load_qa_dataset(dataset_name: str, cache_dir: str, streaming: bool = False):
+    """
+    Load the training split, reusing a local Arrow copy when one exists.
+
+    load_from_disk memory-maps the saved copy, skipping the hub lookup and
+    schema validation that load_dataset repeats on every run. Streaming mode
+    bypasses the cache entirely for datasets too large to hold locally.
+    """
+    if streaming:
+        return load_dataset(dataset_name, split="train", streaming=True)
+
+    cache_path = Path(cache_dir)
+    if cache_path.exists():
+        logger.info(f"📦 Loading cached dataset from {cache_path}")
+        return load_from_disk(str(cache_path))
+
+    dataset = load_dataset(dataset_name, split="train")
+    dataset.save_to_disk(str(cache_path))
+    logger.info(f"💾 Cached dataset to {cache_path}")
+    return dataset
+
+
+def build_payload(item: Dict, question: str, answer: str, category: str, dataset_name: str) -> Dict[str, Any]:
+    """Build the Qdrant payload for a Q&A pair, keeping simple extra fields as metadata."""
+    payload = {
+        "question": question,
+        "answer": answer,
+        "category": category,
+        "dataset_source": dataset_name,
+    }
     
-    return question.strip(), answer.strip(), category
+    # Add any additional metadata fields
+    for key, value in item.items():
+        if key.startswith("qa_"):
+            continue
+        if key not in ['question', 'answer', 'query', 'response', 'text', 'input', 'output', 'completion']:
+            # Only add simple types (str, int, float, bool)
+            if isinstance(value, (str, int, float, bool)):
+                payload[f"meta_{key}"] = value
+    return payload
+
+
+def generate_points(
+    model: TextEmbedding,
+    dataset: Iterable[Dict],
+    dataset_name: str,
+    limit: int,
+    batch_size: int,
+    stats: Dict[str, int],
+) -> Iterator[models.PointStruct]:
+    """
+    Yield Q&A points, embedding questions `batch_size` at a time.
+    Counts go into `stats` ("processed", "skipped") so the caller can report them.
+    """
+    batch_texts: List[str] = []
+    batch_payloads: List[Dict] = []
+    queued = 0
+
+    def flush() -> Iterator[models.PointStruct]:
+        # Embed all questions of the window in one pass
+        embeddings = model.embed(batch_texts, batch_size=len(batch_texts))
+        for emb, payload in zip(embeddings, batch_payloads):
+            # Validated again by upload_points when it builds the request
+            yield models.PointStruct.model_construct(
+                id=qa_point_id(payload["question"], payload["answer"]),
+                vector=emb.tolist(),
+                payload=payload
+            )
+        stats["processed"] += len(batch_texts)
+        total = limit if limit < sys.maxsize else "all"
+        logger.info(f"✅ Processed {stats['processed']}/{total} Q&A pairs... (skipped: {stats['skipped']})")
+        batch_texts.clear()
+        batch_payloads.clear()
+
+    for item in dataset:
+        if queued >= limit:
+            logger.info(f"🛑 Reached limit of {limit} items.")
+            break
+
+        # Q&A pair extracted up front by add_qa_columns
+        question, answer, category = item["qa_question"], item["qa_answer"], item["qa_category"]
+        
+        # Skip if question or answer is empty
+        if not question or not answer:
+            stats["skipped"] += 1
+            continue
+
+        # Use question as the text to embed (for retrieval)
+        batch_texts.append(question)
+        batch_payloads.append(build_payload(item, question, answer, category, dataset_name))
+        queued += 1
+
+        if len(batch_texts) >= batch_size:
+            yield from flush()
+
+    # Process remaining items
+    if batch_texts:
+        yield from flush()
 
 
 def main():
@@ -170,13 +300,54 @@ def main():
         "--batch-size",
         type=int,
         default=DEFAULT_BATCH_SIZE,
-        help=f"Batch size for ingestion (default: {DEFAULT_BATCH_SIZE})"
+        help=f"Embedding batch size (default: {DEFAULT_BATCH_SIZE})"
+    )
+    parser.add_argument(
+        "--upload-batch-size",
+        type=int,
+        default=DEFAULT_UPLOAD_BATCH_SIZE,
+        help=f"Qdrant upload batch size (default: {DEFAULT_UPLOAD_BATCH_SIZE})"
+    )
+    parser.add_argument(
+        "--parallel",
+        type=int,
+        default=DEFAULT_PARALLEL,
+        help=f"Number of parallel upload workers (default: {DEFAULT_PARALLEL})"
     )
     parser.add_argument(
         "--model",
         default="Qdrant/clip-ViT-B-32-text",
         help="Text embedding model to use"
     )
+    parser.add_argument(
+        "--providers",
+        default=DEFAULT_PROVIDERS,
+        help="Comma-separated ONNX Runtime providers, or 'auto' for CUDA when available then CPU"
+    )
+    transport = parser.add_mutually_exclusive_group()
+    transport.add_argument(
+        "--grpc",
+        dest="grpc",
+        action="store_true",
+        default=True,
+        help="Upload over gRPC (default)"
+    )
+    transport.add_argument(
+        "--rest",
+        dest="grpc",
+        action="store_false",
+        help="Upload over REST/JSON instead of gRPC"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help=f"Local dataset cache (default: {DEFAULT_CACHE_ROOT}/<dataset>)"
+    )
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="Stream the dataset instead of caching it (for very large datasets)"
+    )
     
     args = parser.parse_args()
     
@@ -192,9 +363,16 @@ def main():
     # Initialize Embedding Model first to get vector size
     logger.info(f"🧠 Loading text embedding model: {args.model}...")
     try:
-        embedding_model = TextEmbedding(model_name=args.model)
+        providers = select_providers(args.providers)
+        logger.info(f"⚡ ONNX providers: {', '.join(providers)}")
+        embedding_model = TextEmbedding(
+            model_name=args.model,
+            threads=os.cpu_count(),
+            providers=providers,
+            cache_dir=DEFAULT_FASTEMBED_CACHE,
+        )
         
-        # Detect vector size by generating a test embedding
+        # Detect vector size by generating a test embedding (also warms up ORT)
         test_embedding = list(embedding_model.embed(["test"]))[0]
         vector_size = len(test_embedding)
         
@@ -204,73 +382,45 @@ def main():
         exit(1)
 
     # Initialize Qdrant with detected size
-    client = init_qdrant(endpoint, api_key, args.collection, vector_size)
+    client = init_qdrant(endpoint, api_key, args.collection, vector_size, prefer_grpc=args.grpc)
 
     # Load Dataset
     logger.info("📥 Loading dataset from Hugging Face...")
     try:
-        dataset = load_dataset(args.dataset, split="train")
-        logger.info(f"✅ Dataset loaded: {len(dataset)} total items")
+        cache_dir = args.cache_dir or str(Path(DEFAULT_CACHE_ROOT) / args.dataset.replace("/", "__"))
+        dataset = load_qa_dataset(args.dataset, cache_dir, streaming=args.streaming)
+        dataset = add_qa_columns(dataset, streaming=args.streaming)
+        if args.streaming:
+            logger.info("✅ Dataset opened in streaming mode")
+        else:
+            logger.info(f"✅ Dataset loaded: {len(dataset)} total items")
     except Exception as e:
         logger.error(f"❌ Failed to load dataset: {e}")
         logger.error("💡 Tip: Make sure the dataset name is correct and publicly accessible")
         exit(1)
 
-    # Processing Loop
-    batch_texts = []
-    batch_payloads = []
-    total_processed = 0
-    skipped = 0
+    stats = {"processed": 0, "skipped": 0}
     
     logger.info("⚙️  Processing Q&A pairs...")
     
     try:
-        limit = args.limit if args.limit > 0 else len(dataset)
+        if args.limit > 0:
+            limit = args.limit
+        else:
+            limit = sys.maxsize if args.streaming else len(dataset)
         
-        for i, item in enumerate(dataset):
-            if total_processed >= limit:
-                logger.info(f"🛑 Reached limit of {limit} items.")
-                break
-
-            # Extract Q&A pair
-            question, answer, category = extract_qa_pair(item)
-            
-            # Skip if question or answer is empty
-            if not question or not answer:
-                skipped += 1
-                continue
-
-            # Prepare payload with all metadata
-            payload = {
-                "question": question,
-                "answer": answer,
-                "category": category,
-                "dataset_source": args.dataset,
-            }
-            
-            # Add any additional metadata fields
-            for key, value in item.items():
-                if key not in ['question', 'answer', 'query', 'response', 'text', 'input', 'output', 'completion']:
-                    # Only add simple types (str, int, float, bool)
-                    if isinstance(value, (str, int, float, bool)):
-                        payload[f"meta_{key}"] = value
-
-            # Use question as the text to embed (for retrieval)
-            batch_texts.append(question)
-            batch_payloads.append(payload)
-
-            # Process batch
-            if len(batch_texts) >= args.batch_size:
-                upsert_batch(client, args.collection, embedding_model, batch_texts, batch_payloads)
-                total_processed += len(batch_texts)
-                logger.info(f"✅ Processed {total_processed}/{limit} Q&A pairs... (skipped: {skipped})")
-                batch_texts = []
-                batch_payloads = []
-
-        # Process remaining items
-        if batch_texts:
-            upsert_batch(client, args.collection, embedding_model, batch_texts, batch_payloads)
-            total_processed += len(batch_texts)
+        # upload_points batches, retries, and parallelizes the network I/O
+        # while the generator keeps embedding the next window
+        client.upload_points(
+            collection_name=args.collection,
+            points=generate_points(
+                embedding_model, dataset, args.dataset, limit, args.batch_size, stats
+            ),
+            batch_size=args.upload_batch_size,
+            parallel=args.parallel,
+        )
+        total_processed = stats["processed"]
+        skipped = stats["skipped"]
 
         logger.info("=" * 80)
         logger.info(f"🎉 Ingestion complete!")
@@ -281,7 +431,7 @@ def main():
 
     except KeyboardInterrupt:
         logger.info("\n⚠️  Ingestion stopped by user.")
-        logger.info(f"Processed {total_processed} items before stopping.")
+        logger.info(f"Processed {stats['processed']} items before stopping.")
     except Exception as e:
         logger.error(f"❌ Unexpected error during processing: {e}")
         import traceback
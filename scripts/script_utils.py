@@ -0,0 +1,39 @@
+"""
+Helpers shared by the maintenance and test scripts in this directory.
+"""
+
+import os
+import traceback
+from typing import Optional, Tuple
+
+from qdrant_client import QdrantClient
+
+# Connection settings every script's Qdrant client uses
+QDRANT_CLIENT_OPTIONS = {"prefer_grpc": True, "pool_size": 50, "timeout": 60}
+
+_client: Optional[QdrantClient] = None
+
+
+def qdrant_credentials() -> Tuple[Optional[str], Optional[str]]:
+    """Qdrant endpoint and API key from the environment (VITE_QUADRANT_* or QDRANT_*)."""
+    endpoint = os.getenv("VITE_QUADRANT_ENDPOINT") or os.getenv("QDRANT_URL")
+    api_key = os.getenv("VITE_QUADRANT_API_KEY") or os.getenv("QDRANT_API_KEY")
+    return endpoint, api_key
+
+
+def get_qdrant(url: Optional[str] = None, api_key: Optional[str] = None) -> Optional[QdrantClient]:
+    """Return the shared Qdrant client (None without credentials), connecting on first use."""
+    global _client
+    if _client is None:
+        if not url or not api_key:
+            url, api_key = qdrant_credentials()
+        if not url or not api_key:
+            return None
+        _client = QdrantClient(url=url, api_key=api_key, **QDRANT_CLIENT_OPTIONS)
+    return _client
+
+
+def dump_exc():
+    """Print the current traceback when DEBUG is set."""
+    if os.getenv("DEBUG"):
+        traceback.print_exc()
@@ -3,7 +3,8 @@
 import os
 from dotenv import load_dotenv
 from google import genai
-import json
+from google.genai import types
+from pydantic import BaseModel
 
 load_dotenv()
 
@@ -15,6 +16,14 @@ print(f"\nAPI Key: {key[:15]}...{key[-5:] if key else 'None'}")
 
 client = genai.Client(api_key=key)
 
+
+class AdCopy(BaseModel):
+    headline: str
+    body: str
+    call_to_action: str
+    image_suggestions: str
+
+
 # Test the exact prompt we use in the agent
 prompt = """You are a professional copywriter creating an advertisement.
 
@@ -49,7 +58,12 @@ print("=" * 70)
 try:
     response = client.models.generate_content(
         model="gemini-2.0-flash-exp",
-        contents=prompt
+        contents=prompt,
+        # Structured output: the SDK validates the JSON into AdCopy for us
+        config=types.GenerateContentConfig(
+            response_mime_type="application/json",
+            response_schema=AdCopy,
+        ),
     )
     
     print("\n✅ GEMINI API SUCCESS!")
@@ -58,22 +72,15 @@ try:
     print(response.text)
     print("-" * 70)
     
-    # Try to parse JSON
-    response_text = response.text.strip()
-    if "```json" in response_text:
-        response_text = response_text.split("```json")[1].split("```")[0].strip()
-    elif "```" in response_text:
-        response_text = response_text.split("```")[1].split("```")[0].strip()
-    
-    try:
-        ad_data = json.loads(response_text)
+    ad_data = response.parsed
+    if isinstance(ad_data, AdCopy):
         print("\n✅ Parsed JSON Successfully:")
-        print(f"  Headline: {ad_data.get('headline', 'N/A')}")
-        print(f"  Body: {ad_data.get('body', 'N/A')[:100]}...")
-        print(f"  CTA: {ad_data.get('call_to_action', 'N/A')}")
+        print(f"  Headline: {ad_data.headline}")
+        print(f"  Body: {ad_data.body[:100]}...")
+        print(f"  CTA: {ad_data.call_to_action}")
         print("\n🎉 GEMINI IS WORKING - Real ad copy generated!")
-    except json.JSONDecodeError as e:
-        print(f"\n⚠️  JSON parse error: {e}")
+    else:
+        print("\n⚠️  Response did not match the AdCopy schema")
         print("But Gemini responded with text!")
         
 except Exception as e:
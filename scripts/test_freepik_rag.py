@@ -1,12 +1,19 @@
 import os
 import sys
+import asyncio
 import logging
+import uuid
+from functools import lru_cache
 from dotenv import load_dotenv
-from qdrant_client import QdrantClient
+from qdrant_client import models
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from script_utils import dump_exc, get_qdrant
+
+load_dotenv()
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -16,21 +23,80 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 COLLECTION_NAME = "freepik_landscaping"
+QUERY_CACHE_COLLECTION = "query_cache"  # Past test queries and their search results
+QUERY_CACHE_THRESHOLD = 0.97  # Cosine similarity at which a past query counts as the same
+
+def enable_search_cache(agent):
+    """
+    Wrap agent.search_images with a semantic cache in QUERY_CACHE_COLLECTION.
+
+    A query whose embedding is within QUERY_CACHE_THRESHOLD of a cached one
+    (same top_k, no filters) reuses that query's results, so repeated test runs
+    skip the search. Query embeddings are memoized so a miss embeds only once.
+    """
+    client = get_qdrant()
+    if client is None:
+        return agent
+    
+    agent._embed_query = lru_cache(maxsize=256)(agent._embed_query)
+    search_images = agent.search_images
+    
+    def cached_search_images(query, top_k=None, filters=None, **kwargs):
+        top_k_args = {} if top_k is None else {"top_k": top_k}
+        if filters:
+            return search_images(query, filters=filters, **top_k_args, **kwargs)
+        
+        vector = agent._embed_query(query)
+        if not client.collection_exists(QUERY_CACHE_COLLECTION):
+            client.create_collection(
+                QUERY_CACHE_COLLECTION,
+                vectors_config=models.VectorParams(size=len(vector), distance=models.Distance.COSINE)
+            )
+        
+        hits = client.query_points(
+            collection_name=QUERY_CACHE_COLLECTION,
+            query=vector,
+            query_filter=models.Filter(must=[
+                models.FieldCondition(key="top_k", match=models.MatchValue(value=top_k or 0))
+            ]),
+            score_threshold=QUERY_CACHE_THRESHOLD,
+            limit=1
+        ).points
+        if hits:
+            logger.info(f"⚡ Cache hit for '{query}' (matched '{hits[0].payload['query']}')")
+            return hits[0].payload["results"]
+        
+        results = search_images(query, **top_k_args, **kwargs)
+        if results:
+            client.upsert(QUERY_CACHE_COLLECTION, [
+                models.PointStruct(
+                    id=str(uuid.uuid5(uuid.NAMESPACE_URL, f"{top_k}:{query}")),
+                    vector=vector,
+                    payload={"query": query, "top_k": top_k or 0, "results": results}
+                )
+            ])
+        return results
+    
+    agent.search_images = cached_search_images
+    return agent
 
-def test_collection_exists():
+@lru_cache(maxsize=None)
+def get_agent():
+    """Build the search agent (and load its embedding models) once for all tests."""
+    from freepik_agent import FreepikLandscapingAgent
+    
+    return enable_search_cache(FreepikLandscapingAgent())
+
+def test_collection_exists(client=None):
     """Test if the Freepik collection exists."""
     logger.info("🔍 Testing collection existence...")
     
-    load_dotenv()
-    endpoint = os.getenv("VITE_QUADRANT_ENDPOINT") or os.getenv("QDRANT_URL")
-    api_key = os.getenv("VITE_QUADRANT_API_KEY") or os.getenv("QDRANT_API_KEY")
-    
-    if not endpoint or not api_key:
+    client = client or get_qdrant()
+    if client is None:
         logger.error("❌ Missing Qdrant credentials")
         return False
     
     try:
-        client = QdrantClient(url=endpoint, api_key=api_key)
         exists = client.collection_exists(COLLECTION_NAME)
         
         if exists:
@@ -57,9 +123,7 @@ def test_search():
     logger.info("\n🔍 Testing search functionality...")
     
     try:
-        from freepik_agent import FreepikLandscapingAgent
-        
-        agent = FreepikLandscapingAgent()
+        agent = get_agent()
         
         # Test query
         query = "ornamental tree"
@@ -80,8 +144,7 @@ def test_search():
             
     except Exception as e:
         logger.error(f"❌ Search test failed: {e}")
-        import traceback
-        traceback.print_exc()
+        dump_exc()
         return False
 
 def test_recommendations():
@@ -89,9 +152,7 @@ def test_recommendations():
     logger.info("\n🤖 Testing AI recommendations...")
     
     try:
-        from freepik_agent import FreepikLandscapingAgent
-        
-        agent = FreepikLandscapingAgent()
+        agent = get_agent()
         
         query = "drought tolerant plants for California garden"
         logger.info(f"🔎 Getting recommendations for: '{query}'")
@@ -109,55 +170,48 @@ def test_recommendations():
         
     except Exception as e:
         logger.error(f"❌ Recommendation test failed: {e}")
-        import traceback
-        traceback.print_exc()
+        dump_exc()
         return False
 
-def test_api_endpoints():
+async def test_api_endpoints():
     """Test API endpoints (requires server to be running)."""
     logger.info("\n🌐 Testing API endpoints...")
     
     try:
-        import requests
+        import httpx
         
-        base_url = "http://localhost:8002"
-        
-        # Test health endpoint
-        logger.info("Testing /api/freepik/health...")
-        response = requests.get(f"{base_url}/api/freepik/health", timeout=5)
+        # Health and search are independent, so hit them concurrently
+        logger.info("Testing /api/freepik/health and /api/freepik/search...")
+        search_data = {
+            "query": "evergreen shrub",
+            "top_k": 3
+        }
+        async with httpx.AsyncClient(base_url="http://localhost:8002", timeout=10.0) as client:
+            health, search = await asyncio.gather(
+                client.get("/api/freepik/health", timeout=5.0),
+                client.post("/api/freepik/search", json=search_data)
+            )
         
-        if response.status_code == 200:
-            data = response.json()
+        if health.status_code == 200:
+            data = health.json()
             logger.info(f"✅ Health check passed")
             logger.info(f"   Status: {data['status']}")
             logger.info(f"   Points: {data.get('points_count', 'N/A')}")
         else:
-            logger.warning(f"⚠️  Health check returned {response.status_code}")
+            logger.warning(f"⚠️  Health check returned {health.status_code}")
             return False
         
-        # Test search endpoint
-        logger.info("\nTesting /api/freepik/search...")
-        search_data = {
-            "query": "evergreen shrub",
-            "top_k": 3
-        }
-        response = requests.post(
-            f"{base_url}/api/freepik/search",
-            json=search_data,
-            timeout=10
-        )
-        
-        if response.status_code == 200:
-            data = response.json()
+        if search.status_code == 200:
+            data = search.json()
             logger.info(f"✅ Search endpoint working")
             logger.info(f"   Found: {data['count']} results")
         else:
-            logger.warning(f"⚠️  Search returned {response.status_code}")
+            logger.warning(f"⚠️  Search returned {search.status_code}")
             return False
         
         return True
         
-    except requests.exceptions.ConnectionError:
+    except httpx.ConnectError:
         logger.warning("⚠️  API server not running")
         logger.info("💡 Start server with: python freepik_api.py")
         return False
@@ -182,7 +236,7 @@ def main():
     if results["Collection Exists"]:
         results["Search Functionality"] = test_search()
         results["AI Recommendations"] = test_recommendations()
-        results["API Endpoints"] = test_api_endpoints()
+        results["API Endpoints"] = asyncio.run(test_api_endpoints())
     
     # Summary
     print("\n" + "="*60)
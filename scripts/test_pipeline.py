@@ -12,6 +12,7 @@ from dotenv import load_dotenv
 
 # Import the simple agent
 from agent import AdGenerationAgent
+from script_utils import dump_exc
 
 async def test_pipeline():
     """Test full pipeline."""
@@ -66,11 +67,13 @@ async def test_pipeline():
         print(f"  {i}. {p['description']}")
         print(f"     Reference: {p.get('product_reference', 'none')}")
     
-    # Generate images
+    # Generate images and ad copy concurrently: the ad copy only needs the
+    # products, so it no longer waits on the 30-60s Freepik job
     print("\n🎨 Generating images with Freepik...")
     print("(This may take 30-60 seconds...)")
+    print("\n✍️  Generating ad copy with Gemini...")
     
-    generated_images = []
+    image_tasks = []
     for prompt_data in prompts[:1]:  # Just 1 image for testing
         prompt = prompt_data.get("prompt", "")
         product_ref = prompt_data.get("product_reference", "none")
@@ -83,7 +86,13 @@ async def test_pipeline():
                     reference_url = product.image_url
                     break
         
-        result = agent.generate_image_with_freepik(prompt, reference_url)
+        image_tasks.append(asyncio.to_thread(agent.generate_image_with_freepik, prompt, reference_url))
+    
+    ad_task = asyncio.to_thread(agent.generate_ad_copy, query, products, [])
+    ad_copy, *image_results = await asyncio.gather(ad_task, *image_tasks)
+    
+    generated_images = []
+    for result in image_results:
         if result:
             generated_images.append(result)
             if result.status == "completed":
@@ -91,9 +100,6 @@ async def test_pipeline():
             else:
                 print(f"⚠️  Image status: {result.status}")
     
-    # Generate ad copy
-    print("\n✍️  Generating ad copy with Gemini...")
-    ad_copy = agent.generate_ad_copy(query, products, generated_images)
     print(f"✓ Ad copy created:")
     print(f"  Headline: {ad_copy.headline}")
     print(f"  CTA: {ad_copy.call_to_action}")
@@ -135,8 +141,7 @@ if __name__ == "__main__":
             print("\n❌ FAILED")
     except Exception as e:
         print(f"\n❌ ERROR: {e}")
-        import traceback
-        traceback.print_exc()
+        dump_exc()
 
 
 
@@ -14,8 +14,36 @@ Tests:
 
 import os
 import sys
+import asyncio
+import textwrap
 from dotenv import load_dotenv
 from plant_agent import PlantRAGAgent
+from script_utils import dump_exc, get_qdrant
+
+GEMINI_CONCURRENCY = 15  # Answer generations in flight at once
+
+# Indents and wraps answer paragraphs to the width of the report rules
+ANSWER_WRAPPER = textwrap.TextWrapper(
+    width=78,
+    initial_indent="  ",
+    subsequent_indent="  ",
+    break_long_words=False
+)
+
+async def generate_answers(agent: PlantRAGAgent, queries, source_batches):
+    """Generate answers for every query that has sources, concurrently; failures are returned, not raised."""
+    semaphore = asyncio.Semaphore(GEMINI_CONCURRENCY)
+    
+    async def generate(query, sources):
+        if not sources:
+            return None
+        async with semaphore:
+            return await agent.agenerate_answer(query, sources)
+    
+    return await asyncio.gather(
+        *(generate(query, sources) for query, sources in zip(queries, source_batches)),
+        return_exceptions=True
+    )
 
 
 def test_plant_rag():
@@ -48,7 +76,8 @@ def test_plant_rag():
             qdrant_url=required["QDRANT_URL"],
             qdrant_api_key=required["QDRANT_API_KEY"],
             gemini_api_key=required["GEMINI_API_KEY"],
-            collection_name=os.getenv("PLANT_COLLECTION", "plant-knowledge")
+            collection_name=os.getenv("PLANT_COLLECTION", "plant-knowledge"),
+            qdrant_client=get_qdrant(required["QDRANT_URL"], required["QDRANT_API_KEY"])
         )
         print("✅ Agent initialized successfully")
     except Exception as e:
@@ -65,18 +94,28 @@ def test_plant_rag():
     print(f"\n[Step 3] Testing {len(test_queries)} queries...")
     print("-" * 80)
     
+    # Embed every query in one model call, then search for all in one round trip
+    print("\n🧮 Embedding test queries...")
+    print("🔍 Searching knowledge base...")
+    try:
+        query_vectors = agent.embed_queries(test_queries)
+        source_batches = agent.search_knowledge_batch(test_queries, limit=3, query_vectors=query_vectors)
+    except Exception as e:
+        print(f"❌ Search failed: {e}")
+        return False
+    
+    # Generate all answers concurrently instead of one Gemini call at a time
+    print("🤖 Generating answers with Gemini...")
+    answers = asyncio.run(generate_answers(agent, test_queries, source_batches))
+    
     all_passed = True
     
-    for i, query in enumerate(test_queries, 1):
+    for i, (query, sources, result) in enumerate(zip(test_queries, source_batches, answers), 1):
         print(f"\n📝 Test Query {i}/{len(test_queries)}")
         print(f"Question: {query}")
         print()
         
         try:
-            # Search knowledge base
-            print("  🔍 Searching knowledge base...")
-            sources = agent.search_knowledge(query, limit=3)
-            
             if not sources:
                 print("  ⚠️  No sources found - collection may be empty")
                 all_passed = False
@@ -91,39 +130,22 @@ def test_plant_rag():
             print(f"     Q: {top_source.question[:80]}...")
             print(f"     A: {top_source.answer[:100]}...")
             
-            # Generate answer
-            print("\n  🤖 Generating answer with Gemini...")
-            result = agent.generate_answer(query, sources)
+            if isinstance(result, Exception):
+                raise result
             
-            print(f"  ✅ Answer generated (confidence: {result['confidence']:.2%})")
+            print(f"\n  ✅ Answer generated (confidence: {result['confidence']:.2%})")
             print(f"\n  💡 Answer:")
             print(f"  {'-' * 76}")
             
             # Print answer with wrapping
-            answer_lines = result['answer'].split('\n')
-            for line in answer_lines:
-                if len(line) <= 76:
-                    print(f"  {line}")
-                else:
-                    # Simple word wrap
-                    words = line.split()
-                    current_line = "  "
-                    for word in words:
-                        if len(current_line) + len(word) + 1 <= 78:
-                            current_line += word + " "
-                        else:
-                            print(current_line.rstrip())
-                            current_line = "  " + word + " "
-                    if current_line.strip():
-                        print(current_line.rstrip())
+            print("\n".join(ANSWER_WRAPPER.fill(line) for line in result['answer'].split('\n')))
             
             print(f"  {'-' * 76}")
             
         except Exception as e:
             print(f"  ❌ Test failed: {e}")
             all_passed = False
-            import traceback
-            traceback.print_exc()
+            dump_exc()
     
     # Summary
     print("\n" + "=" * 80)
@@ -155,6 +177,5 @@ if __name__ == "__main__":
         sys.exit(1)
     except Exception as e:
         print(f"\n❌ Unexpected error: {e}")
-        import traceback
-        traceback.print_exc()
+        dump_exc()
         sys.exit(1)
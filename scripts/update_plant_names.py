@@ -4,22 +4,37 @@ Uses Gemini Vision to analyze images and provide specific botanical/material nam
 """
 
 import os
+import asyncio
+import hashlib
+import sqlite3
 import logging
 import time
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 from dotenv import load_dotenv
-from qdrant_client import QdrantClient
+from qdrant_client import AsyncQdrantClient, models
 import google.generativeai as genai
-import requests
-from PIL import Image
+import httpx
 from io import BytesIO
+from PIL import Image
+from script_utils import QDRANT_CLIENT_OPTIONS, qdrant_credentials
 
 load_dotenv()
 
 # Configuration
 COLLECTION_NAME = "freepik_landscaping"
-BATCH_SIZE = 10  # Process in small batches to avoid rate limits
-DELAY_BETWEEN_REQUESTS = 2  # Seconds between Gemini API calls
+BATCH_SIZE = 10  # Identified names saved per batch_update_points call
+SCROLL_PAGE_SIZE = 256  # Points fetched per scroll request; decoupled from BATCH_SIZE
+GEMINI_RPM = 60  # Gemini requests per minute, shared by all concurrent calls
+MAX_CONCURRENT_DOWNLOADS = 20  # Downloader workers; keeps the Freepik CDN from rate-limiting us
+GEMINI_CONCURRENCY = 10  # Gemini calls in flight at once (GEMINI_RPM still applies)
+GEMINI_QUEUE_SIZE = 32  # Downloaded images waiting for Gemini
+DOWNLOAD_TIMEOUT = 10
+GEMINI_IMAGE_SIZE = 768  # Longest side sent to Gemini; it downscales larger images anyway
+SCROLL_FIELDS = ["title", "image_url", "search_term", "description"]  # Only payload fields the update reads
+
+# Gemini answers keyed by image content hash, so duplicate images and re-runs
+# (including --force) are named without another API call
+NAME_CACHE_DB = ".gemini_vision_cache.sqlite"
 
 # Setup logging
 logging.basicConfig(
@@ -28,17 +43,32 @@ logging.basicConfig(
     datefmt='%H:%M:%S'
 )
 logger = logging.getLogger(__name__)
+logging.getLogger("httpx").setLevel(logging.WARNING)  # Don't log every image GET
+
+_qdrant: Optional[AsyncQdrantClient] = None
+
+def get_qdrant() -> AsyncQdrantClient:
+    """Return the shared async Qdrant client, connecting on first use."""
+    global _qdrant
+    if _qdrant is None:
+        endpoint, api_key = qdrant_credentials()
+        
+        if not endpoint or not api_key:
+            raise ValueError("Missing Qdrant credentials")
+        
+        _qdrant = AsyncQdrantClient(url=endpoint, api_key=api_key, **QDRANT_CLIENT_OPTIONS)
+    return _qdrant
+
+async def close_qdrant():
+    """Close the shared Qdrant client so the next get_qdrant() reconnects."""
+    global _qdrant
+    if _qdrant is not None:
+        await _qdrant.close()
+        _qdrant = None
 
 def init_clients():
     """Initialize Qdrant and Gemini clients."""
-    # Qdrant
-    endpoint = os.getenv("VITE_QUADRANT_ENDPOINT") or os.getenv("QDRANT_URL")
-    api_key = os.getenv("VITE_QUADRANT_API_KEY") or os.getenv("QDRANT_API_KEY")
-    
-    if not endpoint or not api_key:
-        raise ValueError("Missing Qdrant credentials")
-    
-    qdrant_client = QdrantClient(url=endpoint, api_key=api_key)
+    qdrant_client = get_qdrant()
     
     # Gemini
     gemini_key = os.getenv("GEMINI_API_KEY")
@@ -50,33 +80,9 @@ def init_clients():
     
     return qdrant_client, gemini_model
 
-def download_image(url: str) -> Image.Image:
-    """Download image from URL."""
-    try:
-        response = requests.get(url, timeout=10)
-        if response.status_code == 200:
-            return Image.open(BytesIO(response.content))
-    except Exception as e:
-        logger.error(f"Failed to download image from {url}: {e}")
-    return None
-
-def identify_plant_with_gemini(image: Image.Image, current_title: str, search_term: str, model) -> str:
-    """
-    Use Gemini Vision to identify the specific plant or material.
-    
-    Args:
-        image: PIL Image object
-        current_title: Current title from Freepik
-        search_term: The search term used to find this image
-        model: Gemini model instance
-    
-    Returns:
-        Specific plant or material name
-    """
-    prompt = f"""Analyze this landscaping image and provide a SPECIFIC botanical or material name.
-
-Current title: "{current_title}"
-Search category: "{search_term}"
+# Static instructions first and the per-image fields last, so every request
+# shares the longest possible identical prefix (cacheable on Gemini's side)
+PROMPT_TEMPLATE = """Analyze this landscaping image and provide a SPECIFIC botanical or material name.
 
 Instructions:
 1. If it's a plant, provide the SPECIFIC common name and botanical name (e.g., "Japanese Maple (Acer palmatum)")
@@ -93,134 +99,328 @@ Example responses:
 - "Blue Fescue Grass (Festuca glauca)"
 - "Irregular Flagstone Paving"
 - "Mexican Beach Pebbles"
+
+Current title: "{title}"
+Search category: "{term}"
 """
+
+STOP = object()  # Queue sentinel that shuts a pipeline worker down
+
+class AsyncRateLimiter:
+    """Token bucket that spaces out coroutines to at most `max_rate` calls per `time_period` seconds."""
+
+    def __init__(self, max_rate: float, time_period: float = 60):
+        self.rate = max_rate / time_period
+        self.capacity = max_rate
+        self.tokens = float(max_rate)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return self
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+class NameCache:
+    """Persistent sha256(image bytes) -> specific_name lookup."""
+
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS names (image_hash TEXT PRIMARY KEY, specific_name TEXT)")
+        self.conn.commit()
+
+    def get(self, image_hash: str) -> Optional[str]:
+        row = self.conn.execute("SELECT specific_name FROM names WHERE image_hash = ?", (image_hash,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, image_hash: str, specific_name: str):
+        self.conn.execute("INSERT OR REPLACE INTO names VALUES (?, ?)", (image_hash, specific_name))
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+def shrink_image(data: bytes, mime_type: str) -> Tuple[bytes, str]:
+    """Downscale to GEMINI_IMAGE_SIZE and re-encode as JPEG; smaller or undecodable images pass through."""
+    try:
+        with Image.open(BytesIO(data)) as img:
+            if max(img.size) <= GEMINI_IMAGE_SIZE:
+                return data, mime_type
+            img.draft("RGB", (GEMINI_IMAGE_SIZE, GEMINI_IMAGE_SIZE))  # JPEG: decode at reduced scale
+            img = img.convert("RGB")
+        img.thumbnail((GEMINI_IMAGE_SIZE, GEMINI_IMAGE_SIZE), Image.LANCZOS)
+        out = BytesIO()
+        img.save(out, "JPEG", quality=85)
+        return out.getvalue(), "image/jpeg"
+    except Exception:
+        return data, mime_type
+
+async def download_image(http: httpx.AsyncClient, url: str) -> Optional[Tuple[bytes, str]]:
+    """
+    Download image from URL over the shared, connection-pooled client.
+    Returns the image bytes and their MIME type, downscaled (in a worker
+    thread) when larger than GEMINI_IMAGE_SIZE to cut upload size and tokens.
+    """
+    try:
+        response = await http.get(url)
+        if response.status_code == 200:
+            content_type = response.headers.get("content-type", "").split(";")[0].strip()
+            if not content_type.startswith("image/"):
+                content_type = "image/jpeg"
+            return await asyncio.to_thread(shrink_image, response.content, content_type)
+    except Exception as e:
+        logger.error("Failed to download image from %s: %s", url, e)
+    return None
+
+async def identify_plant_with_gemini(image: Tuple[bytes, str], current_title: str, search_term: str, model,
+                                    limiter: AsyncRateLimiter, cache: Optional[NameCache] = None) -> str:
+    """
+    Use Gemini Vision to identify the specific plant or material.
+    
+    Args:
+        image: Raw image bytes and their MIME type
+        current_title: Current title from Freepik
+        search_term: The search term used to find this image
+        model: Gemini model instance
+        limiter: Rate limiter shared by all concurrent Gemini calls
+        cache: Optional name cache checked before, and filled after, the API call
+    
+    Returns:
+        Specific plant or material name
+    """
+    data, mime_type = image
+    image_hash = None
+    if cache:
+        image_hash = hashlib.sha256(data).hexdigest()
+        if (specific_name := cache.get(image_hash)) is not None:
+            logger.info("  Identified (cached): %s", specific_name)
+            return specific_name
+    
+    prompt = PROMPT_TEMPLATE.format(title=current_title, term=search_term)
     
     try:
-        response = model.generate_content([prompt, image])
+        async with limiter:
+            response = await model.generate_content_async([prompt, {"mime_type": mime_type, "data": data}])
         specific_name = response.text.strip()
         
         # Clean up the response
         specific_name = specific_name.replace('"', '').replace('[', '').replace(']', '')
+        if cache:
+            cache.put(image_hash, specific_name)
         
-        logger.info(f"  Identified: {specific_name}")
+        logger.info("  Identified: %s", specific_name)
         return specific_name
     except Exception as e:
-        logger.error(f"  Gemini identification failed: {e}")
+        logger.error("  Gemini identification failed: %s", e)
         return current_title  # Fallback to original title
 
-def update_collection_names(limit: int = None):
+async def ensure_specific_name_index(qdrant_client: AsyncQdrantClient):
+    """Index specific_name so the "not yet named" scroll filter doesn't scan every point."""
+    schema = (await qdrant_client.get_collection(COLLECTION_NAME)).payload_schema
+    if "specific_name" not in schema:
+        logger.info("🗂️  Creating payload index on specific_name...")
+        await qdrant_client.create_payload_index(
+            collection_name=COLLECTION_NAME,
+            field_name="specific_name",
+            field_schema=models.PayloadSchemaType.KEYWORD
+        )
+
+def searchable_text_lower(specific_name: str, title: str, description: str) -> str:
+    """Lower-cased text the RAG keyword search matches against (same format as freepik_ingest)."""
+    return f"{specific_name} {title} {description}".lower()
+
+async def write_names(qdrant_client: AsyncQdrantClient, results: List[tuple], stats: Dict[str, int]):
+    """Save a batch of (point_id, current_title, description, specific_name) results with one Qdrant request."""
+    operations = [
+        models.SetPayloadOperation(
+            set_payload=models.SetPayload(
+                payload={
+                    "specific_name": specific_name,
+                    "original_title": current_title,
+                    "searchable_text_lower": searchable_text_lower(specific_name, current_title, description)
+                },
+                points=[point_id]
+            )
+        )
+        for point_id, current_title, description, specific_name in results
+    ]
+    try:
+        await qdrant_client.batch_update_points(
+            collection_name=COLLECTION_NAME,
+            update_operations=operations
+        )
+        stats["updated"] += len(operations)
+        for _, current_title, _, specific_name in results:
+            logger.info("  ✅ Updated: %.40s → %.40s", current_title, specific_name)
+    except Exception as e:
+        logger.error("  ❌ Error updating batch of %d points: %s", len(operations), e)
+        stats["errors"] += len(operations)
+
+async def update_collection_names(limit: int = None, force: bool = False, use_cache: bool = True):
     """
     Update all points in the collection with Gemini-identified names.
     
+    Runs as a pipeline of asyncio queues: a scroll producer, a pool of image
+    downloaders, a pool of Gemini callers, and a writer that saves results in
+    batches. The next scroll page and downloads proceed while Gemini works,
+    so GEMINI_RPM (which caps the request rate) is the only limit on speed.
+    
     Args:
         limit: Optional limit on number of points to update (for testing)
+        force: Re-identify points that already have a specific_name
+        use_cache: Reuse names already identified for identical image bytes
     """
     logger.info("🚀 Starting collection update with Gemini plant identification...")
     
     # Initialize clients
     qdrant_client, gemini_model = init_clients()
+    limiter = AsyncRateLimiter(GEMINI_RPM, 60)
+    name_cache = NameCache(NAME_CACHE_DB) if use_cache else None
+    # One pooled HTTP client for every image download in the run
+    http = httpx.AsyncClient(
+        timeout=DOWNLOAD_TIMEOUT,
+        follow_redirects=True,
+        limits=httpx.Limits(max_connections=50, max_keepalive_connections=MAX_CONCURRENT_DOWNLOADS),
+    )
+    
+    # Only fetch points that haven't been named yet, so re-runs resume for free
+    scroll_filter = None
+    if not force:
+        await ensure_specific_name_index(qdrant_client)
+        scroll_filter = models.Filter(
+            must=[models.IsEmptyCondition(is_empty=models.PayloadField(key="specific_name"))]
+        )
     
     # Get collection info
-    collection_info = qdrant_client.get_collection(COLLECTION_NAME)
-    total_points = collection_info.points_count
-    logger.info(f"📊 Collection has {total_points} points")
+    total_points = (await qdrant_client.count(
+        collection_name=COLLECTION_NAME,
+        count_filter=scroll_filter,
+        exact=True
+    )).count
+    logger.info("📊 Collection has %d points to update", total_points)
     
     if limit:
         total_points = min(total_points, limit)
-        logger.info(f"🔢 Limited to {total_points} points for this run")
+        logger.info("🔢 Limited to %d points for this run", total_points)
     
-    # Scroll through all points
-    offset = None
-    processed_count = 0
-    updated_count = 0
-    error_count = 0
+    stats = {"processed": 0, "updated": 0, "errors": 0}
+    scroll_q = asyncio.Queue(maxsize=MAX_CONCURRENT_DOWNLOADS * 2)
+    gemini_q = asyncio.Queue(maxsize=GEMINI_QUEUE_SIZE)
+    write_q = asyncio.Queue()
     
-    while True:
-        # Get next batch
-        scroll_result = qdrant_client.scroll(
-            collection_name=COLLECTION_NAME,
-            limit=BATCH_SIZE,
-            offset=offset,
-            with_payload=True,
-            with_vectors=False
-        )
-        
-        points, next_offset = scroll_result
-        
-        if not points:
-            break
-        
-        logger.info(f"\n📦 Processing batch of {len(points)} points...")
-        
-        for point in points:
-            if limit and processed_count >= limit:
-                logger.info(f"✅ Reached limit of {limit} points")
-                break
+    async def producer():
+        offset = None
+        while True:
+            # Get next batch
+            points, next_offset = await qdrant_client.scroll(
+                collection_name=COLLECTION_NAME,
+                limit=SCROLL_PAGE_SIZE,
+                offset=offset,
+                scroll_filter=scroll_filter,
+                with_payload=SCROLL_FIELDS,
+                with_vectors=False
+            )
             
-            processed_count += 1
-            point_id = point.id
-            payload = point.payload
+            if not points:
+                return
             
-            current_title = payload.get('title', 'Unknown')
-            image_url = payload.get('image_url')
-            search_term = payload.get('search_term', '')
+            logger.info("\n📦 Fetched batch of %d points...", len(points))
             
-            logger.info(f"\n[{processed_count}/{total_points}] Processing: {current_title[:50]}...")
-            
-            if not image_url:
-                logger.warning("  ⚠️  No image URL, skipping")
-                error_count += 1
-                continue
-            
-            # Download image
-            image = download_image(image_url)
-            if not image:
-                logger.warning("  ⚠️  Failed to download image, skipping")
-                error_count += 1
-                continue
-            
-            # Identify with Gemini
-            try:
-                specific_name = identify_plant_with_gemini(
-                    image, 
-                    current_title, 
-                    search_term,
-                    gemini_model
-                )
+            for point in points:
+                if limit and stats["processed"] >= limit:
+                    logger.info("✅ Reached limit of %d points", limit)
+                    return
                 
-                # Update Qdrant point
-                qdrant_client.set_payload(
-                    collection_name=COLLECTION_NAME,
-                    payload={
-                        "specific_name": specific_name,
-                        "original_title": current_title
-                    },
-                    points=[point_id]
-                )
+                stats["processed"] += 1
+                payload = point.payload
                 
-                updated_count += 1
-                logger.info(f"  ✅ Updated: {current_title[:40]} → {specific_name[:40]}")
+                current_title = payload.get('title', 'Unknown')
+                image_url = payload.get('image_url')
+                search_term = payload.get('search_term', '')
+                description = payload.get('description') or ''
                 
-                # Rate limiting
-                time.sleep(DELAY_BETWEEN_REQUESTS)
+                logger.info("\n[%d/%d] Processing: %.50s...", stats["processed"], total_points, current_title)
                 
-            except Exception as e:
-                logger.error(f"  ❌ Error updating point: {e}")
-                error_count += 1
-        
-        # Check if we should continue
-        if not next_offset or (limit and processed_count >= limit):
-            break
-        
-        offset = next_offset
+                if not image_url:
+                    logger.warning("  ⚠️  No image URL, skipping")
+                    stats["errors"] += 1
+                    continue
+                
+                await scroll_q.put((point.id, image_url, current_title, search_term, description))
+            
+            # Check if we should continue
+            if not next_offset:
+                return
+            offset = next_offset
+    
+    async def downloader():
+        while (item := await scroll_q.get()) is not STOP:
+            point_id, image_url, current_title, search_term, description = item
+            image = await download_image(http, image_url)
+            if not image:
+                logger.warning("  ⚠️  Failed to download image for %.40s, skipping", current_title)
+                stats["errors"] += 1
+                continue
+            await gemini_q.put((point_id, image, current_title, search_term, description))
+    
+    async def identifier():
+        while (item := await gemini_q.get()) is not STOP:
+            point_id, image, current_title, search_term, description = item
+            specific_name = await identify_plant_with_gemini(
+                image, current_title, search_term, gemini_model, limiter, name_cache
+            )
+            await write_q.put((point_id, current_title, description, specific_name))
+    
+    async def writer():
+        results = []
+        while True:
+            item = await write_q.get()
+            if item is not STOP:
+                results.append(item)
+            if results and (item is STOP or len(results) >= BATCH_SIZE):
+                await write_names(qdrant_client, results, stats)
+                results = []
+            if item is STOP:
+                return
+    
+    writer_task = asyncio.create_task(writer())
+    downloaders = [asyncio.create_task(downloader()) for _ in range(MAX_CONCURRENT_DOWNLOADS)]
+    identifiers = [asyncio.create_task(identifier()) for _ in range(GEMINI_CONCURRENCY)]
+    try:
+        # Shut the stages down in order once the producer has run dry
+        await producer()
+        for _ in downloaders:
+            await scroll_q.put(STOP)
+        await asyncio.gather(*downloaders)
+        for _ in identifiers:
+            await gemini_q.put(STOP)
+        await asyncio.gather(*identifiers)
+        await write_q.put(STOP)
+        await writer_task
+    finally:
+        for task in [*downloaders, *identifiers, writer_task]:
+            task.cancel()
+        await http.aclose()
+        await close_qdrant()
+        if name_cache:
+            name_cache.close()
     
     # Summary
-    logger.info(f"\n{'='*60}")
-    logger.info(f"🎉 Update Complete!")
-    logger.info(f"📊 Total processed: {processed_count}")
-    logger.info(f"✅ Successfully updated: {updated_count}")
-    logger.info(f"❌ Errors: {error_count}")
-    logger.info(f"{'='*60}")
+    logger.info("\n%s", "=" * 60)
+    logger.info("🎉 Update Complete!")
+    logger.info("📊 Total processed: %d", stats["processed"])
+    logger.info("✅ Successfully updated: %d", stats["updated"])
+    logger.info("❌ Errors: %d", stats["errors"])
+    logger.info("%s", "=" * 60)
 
 if __name__ == "__main__":
     import argparse
@@ -238,14 +438,31 @@ if __name__ == "__main__":
         default=10,
         help="Batch size for processing"
     )
+    parser.add_argument(
+        "--scroll-size",
+        type=int,
+        default=SCROLL_PAGE_SIZE,
+        help="Points fetched per Qdrant scroll request"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Re-identify points that already have a specific_name"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help=f"Always call Gemini instead of reusing names cached in {NAME_CACHE_DB}"
+    )
     
     args = parser.parse_args()
     
     if args.batch_size:
         BATCH_SIZE = args.batch_size
+    SCROLL_PAGE_SIZE = args.scroll_size
     
-    logger.info(f"Starting update with batch size: {BATCH_SIZE}")
+    logger.info("Starting update with batch size: %d", BATCH_SIZE)
     if args.limit:
-        logger.info(f"Test mode: Will update {args.limit} points")
+        logger.info("Test mode: Will update %d points", args.limit)
     
-    update_collection_names(limit=args.limit)
+    asyncio.run(update_collection_names(limit=args.limit, force=args.force, use_cache=not args.no_cache))
@@ -6,12 +6,26 @@ Run this before using the ad generation agent.
 
 import os
 import sys
+import asyncio
+from functools import lru_cache
+import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 
+# Pooled session for HTTP checks (keep-alive instead of a new TLS handshake per call)
+HTTP = requests.Session()
+HTTP.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=50))
+
+
+@lru_cache(maxsize=None)
+def _env(name: str):
+    """Read an environment variable once (call after load_dotenv)."""
+    return os.environ.get(name)
+
 
 def check_env_var(name: str) -> bool:
     """Check if an environment variable is set."""
-    value = os.getenv(name)
+    value = _env(name)
     if value:
         print(f"✓ {name}: {'*' * 10}{value[-4:] if len(value) > 4 else '****'}")
         return True
@@ -20,15 +34,15 @@ def check_env_var(name: str) -> bool:
         return False
 
 
-def verify_qdrant():
+async def verify_qdrant():
     """Verify Qdrant connection."""
     print("\n🔍 Verifying Qdrant connection...")
     try:
         from qdrant_client import QdrantClient
         
-        url = os.getenv("QDRANT_URL")
-        api_key = os.getenv("QDRANT_API_KEY")
-        collection = os.getenv("QDRANT_COLLECTION", "shopping-queries-images")
+        url = _env("QDRANT_URL")
+        api_key = _env("QDRANT_API_KEY")
+        collection = _env("QDRANT_COLLECTION") or "shopping-queries-images"
         
         if not url or not api_key:
             print("✗ Qdrant credentials not set")
@@ -37,7 +51,7 @@ def verify_qdrant():
         client = QdrantClient(url=url, api_key=api_key)
         
         # Try to get collection info
-        info = client.get_collection(collection_name=collection)
+        info = await asyncio.to_thread(client.get_collection, collection_name=collection)
         print(f"✓ Connected to Qdrant")
         print(f"  Collection: {collection}")
 
@@ -49,13 +63,13 @@ def verify_qdrant():
         return False
 
 
-def verify_gemini():
+async def verify_gemini():
     """Verify Gemini API."""
     print("\n🤖 Verifying Gemini API...")
     try:
         from google import genai
         
-        api_key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
+        api_key = _env("GEMINI_API_KEY") or _env("GOOGLE_API_KEY")
         if not api_key:
             print("✗ Gemini API key not set")
             return False
@@ -63,7 +77,8 @@ def verify_gemini():
         client = genai.Client(api_key=api_key)
         
         # Test with a simple query
-        response = client.models.generate_content(
+        response = await asyncio.to_thread(
+            client.models.generate_content,
             model="gemini-2.0-flash-exp",
             contents="Say 'Hello'"
         )
@@ -80,13 +95,11 @@ def verify_gemini():
         return False
 
 
-def verify_freepik():
+async def verify_freepik():
     """Verify Freepik API."""
     print("\n🎨 Verifying Freepik API...")
     try:
-        import requests
-        
-        api_key = os.getenv("FREEPIK_API_KEY")
+        api_key = _env("FREEPIK_API_KEY")
         if not api_key:
             print("✗ Freepik API key not set")
             return False
@@ -97,7 +110,8 @@ def verify_freepik():
         }
         
         # Try to access the API (this endpoint might not exist, but it will validate the key)
-        response = requests.get(
+        response = await asyncio.to_thread(
+            HTTP.get,
             "https://api.freepik.com/v1/ai/models",
             headers=headers,
             timeout=10
@@ -152,7 +166,7 @@ def verify_dependencies():
     return all_ok
 
 
-def main():
+async def main():
     """Main verification function."""
     print("=" * 70)
     print("🔧 AD GENERATION AGENT - SETUP VERIFICATION")
@@ -183,7 +197,7 @@ def main():
     
     print("\n📝 Optional variables:")
     for var in optional_vars:
-        value = os.getenv(var)
+        value = _env(var)
         if value:
             print(f"  {var}: {value}")
         else:
@@ -200,12 +214,14 @@ def main():
         print("Please run: pip install -r requirements.txt")
         return False
     
-    # Verify each service
-    checks = [
+    # Verify the services concurrently; each check is one network round trip
+    checks = await asyncio.gather(
         verify_qdrant(),
         verify_gemini(),
         verify_freepik(),
-    ]
+        return_exceptions=True
+    )
+    checks = [check is True for check in checks]
     
     # Summary
     print("\n" + "=" * 70)
@@ -221,7 +237,7 @@ def main():
 
 
 if __name__ == "__main__":
-    success = main()
+    success = asyncio.run(main())
     sys.exit(0 if success else 1)
 
 
@@ -7,9 +7,11 @@ Fixes: 'Floating Product' bugs and 'Cartoonish' text placements.
 """
 
 import asyncio
+import base64
 import json
 import os
 import logging
+import re
 from typing import Any
 from pathlib import Path
 from datetime import datetime
@@ -17,16 +19,22 @@ from datetime import datetime
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
-from pydantic import BaseModel, ValidationError
+from pydantic import BaseModel, Field, ValidationError
 from dotenv import load_dotenv
-import json
-import asyncio
+import httpx
+import orjson
 
 # Ensure agent.py is in the same directory
 from agent import AdGenerationAgent
 
 load_dotenv()
 
+# Environment snapshot, read once at import
+_ENV = {
+    key: os.environ.get(key)
+    for key in ("QDRANT_URL", "QDRANT_API_KEY", "GEMINI_API_KEY", "GOOGLE_API_KEY", "FREEPIK_API_KEY")
+}
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -49,38 +57,226 @@ app.add_middleware(
 @app.middleware("http")
 async def log_requests(request, call_next):
     if request.url.path == "/api/generate-video":
-        body = await request.body()
-        logger.info(f"📨 Raw request body length: {len(body)} bytes")
-        # Try to parse as JSON to see structure
-        try:
-            import json
-            body_json = json.loads(body)
-            logger.info(f"📨 Request keys: {list(body_json.keys())}")
-            for key in body_json.keys():
-                value = body_json[key]
-                if isinstance(value, str):
-                    logger.info(f"   {key}: {len(value)} chars")
-                else:
-                    logger.info(f"   {key}: {value}")
-        except:
-            logger.info(f"📨 Could not parse body as JSON")
+        # Header only: reading the multi-MB body here would buffer and parse it twice.
+        # Field sizes are logged by the endpoint after validation.
+        logger.info(f"📨 Video request content-length: {request.headers.get('content-length', '?')} bytes")
     
     response = await call_next(request)
     return response
 
-# Global agent instance
-agent = None
-
-def get_agent():
-    global agent
-    if agent is None:
-        agent = AdGenerationAgent(
-            qdrant_url=os.getenv("QDRANT_URL"),
-            qdrant_api_key=os.getenv("QDRANT_API_KEY"),
-            gemini_api_key=os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY"),
-            freepik_api_key=os.getenv("FREEPIK_API_KEY"),
+# Shared HTTP/2 client: an ad's image downloads are multiplexed over one connection per CDN host
+_HTTPX = httpx.AsyncClient(
+    timeout=20.0,
+    transport=httpx.AsyncHTTPTransport(
+        http2=True,
+        retries=2,
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=50),
+    ),
+)
+
+@app.on_event("startup")
+async def init_agent():
+    """Build the agent (clients + embedding model) at startup so the first request doesn't pay for it."""
+    Path("history").mkdir(exist_ok=True)
+    app.state.agent_error = None
+    try:
+        app.state.agent = await asyncio.to_thread(
+            AdGenerationAgent,
+            qdrant_url=_ENV["QDRANT_URL"],
+            qdrant_api_key=_ENV["QDRANT_API_KEY"],
+            gemini_api_key=_ENV["GEMINI_API_KEY"] or _ENV["GOOGLE_API_KEY"],
+            freepik_api_key=_ENV["FREEPIK_API_KEY"],
         )
-    return agent
+    except Exception as e:
+        # Keep the app (and its other endpoints) up; ad streams report the failure instead
+        print(f"❌ Failed to initialize ad agent: {e}")
+        app.state.agent = None
+        app.state.agent_error = str(e)
+
+@app.on_event("shutdown")
+async def close_http():
+    """Close pooled HTTP/2 connections on shutdown."""
+    await _HTTPX.aclose()
+
+def _mime(b: bytes) -> str:
+    """Image MIME type from magic bytes (Freepik CDN often sends octet-stream); JPEG by default."""
+    if b[:8] == b"\x89PNG\r\n\x1a\n":
+        return "image/png"
+    if b[8:12] == b"WEBP":
+        return "image/webp"
+    return "image/jpeg"
+
+def _to_data_url(content: bytes) -> str:
+    """Base64-encode image bytes into a data URL (run off the event loop; images are MBs)."""
+    return f"data:{_mime(content)};base64,{base64.b64encode(content).decode('ascii')}"
+
+async def _fetch_display_url(img_url: str) -> str:
+    """Download a generated image and return it as a data URL, or the original URL if that fails."""
+    # Check if URL is already a data URL
+    if img_url.startswith('data:'):
+        return img_url
+    
+    # For regular URLs, try to download but don't fail if it doesn't work
+    # Freepik URLs may work directly in browser even if server-side download fails
+    try:
+        # Add proper headers with Freepik API key for authentication
+        freepik_api_key = _ENV["FREEPIK_API_KEY"] or ""
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            'Accept': 'image/webp,image/apng,image/*,*/*;q=0.8',
+            'Accept-Language': 'en-US,en;q=0.9',
+            'Referer': 'https://www.freepik.com/',
+            'Origin': 'https://www.freepik.com',
+            'Accept-Encoding': 'gzip, deflate, br'
+        }
+        # Add API key if available (for signed URLs that require auth)
+        if freepik_api_key:
+            headers['x-freepik-api-key'] = freepik_api_key
+        
+        print(f"   Attempting to download image from: {img_url[:80]}...")
+        img_response = await _HTTPX.get(img_url, headers=headers, follow_redirects=True)
+        
+        if img_response.status_code == 200:
+            data_url = await asyncio.to_thread(_to_data_url, img_response.content)
+            print(f"   ✅ Converted image to data URL ({len(data_url)} chars)")
+            return data_url
+        else:
+            # Download failed - use URL directly (browser may handle it better)
+            print(f"   ⚠️  Server-side download failed ({img_response.status_code}), using URL directly")
+            print(f"   URL: {img_url[:100]}")
+            return img_url
+    except Exception as e:
+        # Error downloading - use URL directly
+        print(f"   ⚠️  Error downloading image: {str(e)[:100]}")
+        print(f"   Using URL directly (may work in browser): {img_url[:100]}")
+        return img_url
+
+def _reference_images(products) -> list:
+    """Collect Freepik reference images: base64 from data URLs, ('url', url) for everything else."""
+    # Use data URLs we already have from Qdrant, or extract base64 from them
+    reference_images_data = []
+    for product in products:
+        image_url = product.image_url or ""
+        # Prefer data URL if we already have it (downloaded from Qdrant)
+        if image_url.startswith('data:'):
+            # Extract base64 from data URL (partition never raises; sep is empty if there's no comma)
+            _, sep, encoded = image_url.partition(',')
+            if sep:
+                reference_images_data.append(encoded)  # Just the base64 part
+                print(f"   ✅ Using existing data URL for product {product.product_id} (base64: {len(encoded)} chars)")
+            else:
+                print(f"   ⚠️  Could not extract base64 from data URL for {product.product_id}")
+        else:
+            # Fallback: try to download from URL
+            reference_url = getattr(product, 'original_image_url', None) or image_url
+            if reference_url:
+                reference_images_data.append(('url', reference_url))  # Mark as URL to download
+    return reference_images_data
+
+META_SUFFIX = ".meta.json"
+
+
+def _meta_name(filename: str) -> str:
+    """Name of the listing sidecar saved next to a history file."""
+    return filename[:-len(".json")] + META_SUFFIX
+
+
+def _safe_thumb(data: dict) -> str:
+    """First generated image URL of a saved ad, or "" if it has none."""
+    generated = data.get("generated_images")
+    if not generated or not generated[0]:
+        return ""
+    urls = generated[0].get("image_urls")
+    return urls[0] if urls else ""
+
+
+def _history_entry(filename: str, data: dict, mtime: float = None) -> dict:
+    """The /api/history listing fields for one saved ad."""
+    return {
+        "filename": filename,
+        "query": data.get("query", "Unknown"),
+        "timestamp": data.get("timestamp", mtime),
+        "headline": data.get("ad_copy", {}).get("headline", ""),
+        "image_url": _safe_thumb(data)
+    }
+
+# Editorial image prompt wrapped around the per-ad product prompt
+EDITORIAL_PROMPT_TEMPLATE = """
+[STYLE: HIGH-END MAGAZINE EDITORIAL]
+
+1. THE SETUP (GROUNDING)
+- ALL Products ({base_prompt}) are SITTING ON a {surface_material} surface.
+- GRAVITY: All products must rest firmly on surfaces. They must cast realistic contact shadows. 
+- DO NOT let any products float in mid-air.
+- DO NOT use podiums or stages. Make it look like a lifestyle photoshoot.
+
+2. THE COMPOSITION (MINIMALIST)
+- Angle: Eye-level or 45-degree product shot.
+- Framing: Arrange all products naturally in the scene (bottom-right, bottom-center, or distributed).
+- Negative Space: The top-left 60% of the image is clean, blurred background (Bokeh) or solid wall.
+
+3. TYPOGRAPHY (OVERLAY)
+- Treat the text as a GQ/Fortune magazine headline.
+- Text: "{short_headline}"
+- Font: Elegant Serif (like Didot or Bodoni) or Ultra-Bold Sans.
+- Placement: Floating in the Negative Space (Top Left).
+- Color: White or Metallic Gold (High Contrast).
+
+4. LIGHTING & MOOD
+- Lighting: Dramatic "Chiaroscuro" or "Rembrandt" lighting.
+- Shadows: Sharp and deep.
+- Aesthetic: Expensive, Sophisticated, Award-Winning Photography.
+- Resolution: 8k, Hasselblad Medium Format quality.
+"""
+
+# Surface the products sit on: first rule whose words appear in the image prompt or the query
+SURFACE_RULES = (
+    ("rich mahogany wood", ("wood",), ("natural",)),
+    ("brushed aluminum or textured concrete", ("modern",), ("tech",)),
+)
+DEFAULT_SURFACE = "dark polished marble"
+
+# Freepik image jobs in flight across all /api/create-ad streams (per-key rate limit)
+FREEPIK_SEM = asyncio.Semaphore(5)
+
+# Pending history writes (held so they aren't garbage-collected mid-write)
+_background_tasks = set()
+
+# Anything that isn't a letter or digit becomes "_" in history filenames
+_SANITIZE = re.compile(r"[\W_]")
+
+def _write_history(filename: str, final_ad_data: dict):
+    """Save a finished ad plus its listing sidecar to history/."""
+    try:
+        history_dir = Path("history")  # created at startup
+        
+        with open(history_dir / filename, "wb") as f:
+            f.write(orjson.dumps(final_ad_data, option=orjson.OPT_SERIALIZE_NUMPY))
+        # Small sidecar so /api/history can list ads without parsing the full payloads
+        with open(history_dir / _meta_name(filename), "w") as f:
+            json.dump(_history_entry(filename, final_ad_data), f)
+            
+        print(f"✅ Saved ad history to {filename}")
+    except Exception as e:
+        print(f"⚠️ Failed to save history: {e}")
+
+def _sse(payload: dict) -> bytes:
+    """Encode one server-sent event (orjson is several times faster than json on the base64-heavy payloads)."""
+    return b"data: " + orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY) + b"\n\n"
+
+def _sse_prefix(step: str, message: str) -> bytes:
+    """Pre-encode `data: {"step":..,"message":..,"details":` for events whose text never changes."""
+    return b"data: " + orjson.dumps({'step': step, 'message': message})[:-1] + b',"details":'
+
+def _sse_details(prefix: bytes, details: dict) -> bytes:
+    """Finish a pre-encoded event: only the details dict is serialized per call."""
+    return prefix + orjson.dumps(details, option=orjson.OPT_SERIALIZE_NUMPY) + b"}\n\n"
+
+_SSE_NO_PRODUCTS = _sse_prefix('error', 'No products found')
+_SSE_GENERATING_COPY = _sse_prefix('generating_copy', 'Creating editorial ad copy with world-class copywriting...')
+_SSE_COPY_GENERATED = _sse_prefix('copy_generated', 'Ad copy created')
+_SSE_IMAGE_CONVERTING = _sse_prefix('image_converting', 'Converting image to data URL for display...')
+_SSE_IMAGE_ERROR = _sse_prefix('image_error', 'Failed to generate image')
 
 class AdRequest(BaseModel):
     query: str
@@ -90,7 +286,10 @@ class AdRequest(BaseModel):
 async def generate_ad_stream(request: AdRequest):
     """Generator function that yields progress updates"""
     try:
-        agent = get_agent()
+        agent = app.state.agent
+        if agent is None:
+            yield _sse({'step': 'error', 'message': f'Ad agent unavailable: {app.state.agent_error}'})
+            return
         
         # Step 1: Search & Reason - stream as it happens
         search_results_by_query = {}
@@ -106,15 +305,18 @@ async def generate_ad_stream(request: AdRequest):
         # Execute search with progress callback (this is synchronous, so callback happens during search)
         products = agent.search_products(request.query, limit=request.num_products, progress_callback=search_progress_callback)
         if not products:
-            yield f"data: {json.dumps({'step': 'error', 'message': 'No products found', 'details': {'query': request.query}})}\n\n"
+            yield _sse_details(_SSE_NO_PRODUCTS, {'query': request.query})
             return
+        # Product ids/count are echoed in most later events; build them once
+        product_ids = [p.product_id for p in products]
+        num_products = len(products)
         
         # Stream reasoning first (if available)
         reasoning = agent.last_reasoning or {}
         if reasoning:
             search_queries = reasoning.get('search_queries', [])
-            yield f"data: {json.dumps({'step': 'reasoning', 'message': f'Analyzing query and creating {len(search_queries)} diverse product searches...', 'details': {'intent': reasoning.get('intent', 'N/A'), 'search_queries': search_queries, 'categories': reasoning.get('categories', []), 'features': reasoning.get('features', []), 'search_strategy': reasoning.get('search_strategy', 'N/A'), 'reasoning': reasoning.get('reasoning', 'N/A')}})}\n\n"
-            await asyncio.sleep(0.1)
+            yield _sse({'step': 'reasoning', 'message': f'Analyzing query and creating {len(search_queries)} diverse product searches...', 'details': {'intent': reasoning.get('intent', 'N/A'), 'search_queries': search_queries, 'categories': reasoning.get('categories', []), 'features': reasoning.get('features', []), 'search_strategy': reasoning.get('search_strategy', 'N/A'), 'reasoning': reasoning.get('reasoning', 'N/A')}})
+            await asyncio.sleep(0)
             
             # Stream each search query and its results
             for idx, search_query in enumerate(search_queries, 1):
@@ -123,8 +325,8 @@ async def generate_ad_stream(request: AdRequest):
                     'message': f'Searching {idx}/{len(search_queries)}: "{search_query}"...',
                     'details': {'search_index': idx, 'total_searches': len(search_queries), 'query': search_query}
                 }
-                yield f"data: {json.dumps(data)}\n\n"
-                await asyncio.sleep(0.1)
+                yield _sse(data)
+                await asyncio.sleep(0)
                 
                 # Stream results for this search (collected via callback)
                 if search_query in search_results_by_query:
@@ -134,176 +336,77 @@ async def generate_ad_stream(request: AdRequest):
                         'message': f'Found {len(results)} products for "{search_query}"',
                         'details': {'search_query': search_query, 'search_index': idx, 'results': results, 'count': len(results)}
                     }
-                    yield f"data: {json.dumps(data)}\n\n"
-                    await asyncio.sleep(0.1)
+                    yield _sse(data)
+                    await asyncio.sleep(0)
         
         # Step 2: Generate Copy
-        yield f"data: {json.dumps({'step': 'generating_copy', 'message': 'Creating editorial ad copy with world-class copywriting...', 'details': {'query': request.query, 'product_count': len(products)}})}\n\n"
-        await asyncio.sleep(0.1)
+        yield _sse_details(_SSE_GENERATING_COPY, {'query': request.query, 'product_count': num_products})
+        await asyncio.sleep(0)
         
         ad_copy = agent.generate_ad_copy(request.query, products, [])
-        data = {
-            'step': 'copy_generated',
-            'message': 'Ad copy created',
-            'details': {
-                'headline': ad_copy.headline,
-                'body': ad_copy.body,
-                'call_to_action': ad_copy.call_to_action,
-                'full_copy': f"{ad_copy.headline}\n\n{ad_copy.body}\n\n{ad_copy.call_to_action}"
-            }
-        }
-        yield f"data: {json.dumps(data)}\n\n"
-        await asyncio.sleep(0.1)
+        yield _sse_details(_SSE_COPY_GENERATED, {
+            'headline': ad_copy.headline,
+            'body': ad_copy.body,
+            'call_to_action': ad_copy.call_to_action,
+            'full_copy': f"{ad_copy.headline}\n\n{ad_copy.body}\n\n{ad_copy.call_to_action}"
+        })
+        await asyncio.sleep(0)
         
         # Step 3: Generate Single Prompt with ALL Products (one from each search)
-        yield f"data: {json.dumps({'step': 'generating_prompts', 'message': f'Creating single image prompt with all {len(products)} products (one from each search)...', 'details': {'query': request.query, 'num_products': len(products), 'products': [p.product_id for p in products]}})}\n\n"
-        await asyncio.sleep(0.1)
+        yield _sse({'step': 'generating_prompts', 'message': f'Creating single image prompt with all {num_products} products (one from each search)...', 'details': {'query': request.query, 'num_products': num_products, 'products': product_ids}})
+        await asyncio.sleep(0)
         
         # Generate a single prompt that includes ALL products
         prompt_data = agent.generate_image_prompt_with_all_products(request.query, products, ad_copy)
         
-        yield f"data: {json.dumps({'step': 'prompts_generated', 'message': f'Generated single prompt including all {len(products)} products', 'details': {'count': 1, 'products_included': [p.product_id for p in products], 'prompt_preview': prompt_data.get('prompt', '')[:200] + '...'}})}\n\n"
-        await asyncio.sleep(0.1)
+        yield _sse({'step': 'prompts_generated', 'message': f'Generated single prompt including all {num_products} products', 'details': {'count': 1, 'products_included': product_ids, 'prompt_preview': prompt_data.get('prompt', '')[:200] + '...'}})
+        await asyncio.sleep(0)
         
         # Step 4: Generate Single Image with ALL Products
-        yield f"data: {json.dumps({'step': 'generating_image', 'message': f'Generating single ad image with all {len(products)} products...', 'details': {'products': [p.product_id for p in products], 'prompt_preview': prompt_data.get('prompt', '')[:150] + '...'}})}\n\n"
-        await asyncio.sleep(0.1)
+        yield _sse({'step': 'generating_image', 'message': f'Generating single ad image with all {num_products} products...', 'details': {'products': product_ids, 'prompt_preview': prompt_data.get('prompt', '')[:150] + '...'}})
+        await asyncio.sleep(0)
         
         base_prompt = prompt_data.get("prompt", "")
         short_headline = ad_copy.headline[:40]
-        surface_material = "dark polished marble"
-        if "wood" in base_prompt or "natural" in request.query:
-            surface_material = "rich mahogany wood"
-        elif "tech" in request.query or "modern" in base_prompt:
-            surface_material = "brushed aluminum or textured concrete"
-
-        enhanced_prompt = f"""
-[STYLE: HIGH-END MAGAZINE EDITORIAL]
-
-1. THE SETUP (GROUNDING)
-- ALL Products ({base_prompt}) are SITTING ON a {surface_material} surface.
-- GRAVITY: All products must rest firmly on surfaces. They must cast realistic contact shadows. 
-- DO NOT let any products float in mid-air.
-- DO NOT use podiums or stages. Make it look like a lifestyle photoshoot.
-
-2. THE COMPOSITION (MINIMALIST)
-- Angle: Eye-level or 45-degree product shot.
-- Framing: Arrange all products naturally in the scene (bottom-right, bottom-center, or distributed).
-- Negative Space: The top-left 60% of the image is clean, blurred background (Bokeh) or solid wall.
-
-3. TYPOGRAPHY (OVERLAY)
-- Treat the text as a GQ/Fortune magazine headline.
-- Text: "{short_headline}"
-- Font: Elegant Serif (like Didot or Bodoni) or Ultra-Bold Sans.
-- Placement: Floating in the Negative Space (Top Left).
-- Color: White or Metallic Gold (High Contrast).
+        surface_material = next(
+            (material for material, prompt_words, query_words in SURFACE_RULES
+             if any(w in base_prompt for w in prompt_words) or any(w in request.query for w in query_words)),
+            DEFAULT_SURFACE
+        )
 
-4. LIGHTING & MOOD
-- Lighting: Dramatic "Chiaroscuro" or "Rembrandt" lighting.
-- Shadows: Sharp and deep.
-- Aesthetic: Expensive, Sophisticated, Award-Winning Photography.
-- Resolution: 8k, Hasselblad Medium Format quality.
-"""
+        enhanced_prompt = EDITORIAL_PROMPT_TEMPLATE.format(
+            base_prompt=base_prompt,
+            surface_material=surface_material,
+            short_headline=short_headline
+        )
         
-        # Get reference images for ALL products (one from each search)
-        # Use data URLs we already have from Qdrant, or extract base64 from them
-        reference_images_data = []
-        for product in products:
-            # Prefer data URL if we already have it (downloaded from Qdrant)
-            if product.image_url and product.image_url.startswith('data:'):
-                # Extract base64 from data URL
-                try:
-                    header, encoded = product.image_url.split(',', 1)
-                    reference_images_data.append(encoded)  # Just the base64 part
-                    print(f"   ✅ Using existing data URL for product {product.product_id} (base64: {len(encoded)} chars)")
-                except:
-                    print(f"   ⚠️  Could not extract base64 from data URL for {product.product_id}")
-            else:
-                # Fallback: try to download from URL
-                reference_url = getattr(product, 'original_image_url', None) or product.image_url
-                if reference_url:
-                    reference_images_data.append(('url', reference_url))  # Mark as URL to download
+        # Get reference images for ALL products (one from each search);
+        # splitting multi-MB data URLs happens off the event loop
+        reference_images_data = await asyncio.to_thread(_reference_images, products)
         
-        yield f"data: {json.dumps({'step': 'image_processing', 'message': f'Rendering image with Freepik using {len(reference_images_data)} product references...', 'details': {'num_references': len(reference_images_data), 'products': [p.product_id for p in products], 'using_nano_banana': True, 'reference_url': 'Nano Banana product images from Qdrant'}})}\n\n"
-        await asyncio.sleep(0.1)
+        yield _sse({'step': 'image_processing', 'message': f'Rendering image with Freepik using {len(reference_images_data)} product references...', 'details': {'num_references': len(reference_images_data), 'products': product_ids, 'using_nano_banana': True, 'reference_url': 'Nano Banana product images from Qdrant'}})
+        await asyncio.sleep(0)
         
         # Generate single image with all product references
         # Pass first as main reference, rest as additional
-        result = agent.generate_image_with_freepik(
-            enhanced_prompt, 
-            reference_images_data[0] if reference_images_data else None, 
-            additional_references=reference_images_data[1:] if len(reference_images_data) > 1 else []
-        )
+        # Run the blocking Freepik job in a thread, capped across concurrent streams
+        async with FREEPIK_SEM:
+            result = await asyncio.to_thread(
+                agent.generate_image_with_freepik,
+                enhanced_prompt, 
+                reference_images_data[0] if reference_images_data else None, 
+                additional_references=reference_images_data[1:] if len(reference_images_data) > 1 else []
+            )
         
         if result:
-            yield f"data: {json.dumps({'step': 'image_converting', 'message': 'Converting image to data URL for display...', 'details': {'task_id': result.task_id, 'status': result.status, 'products': len(products)}})}\n\n"
-            await asyncio.sleep(0.1)
+            yield _sse_details(_SSE_IMAGE_CONVERTING, {'task_id': result.task_id, 'status': result.status, 'products': num_products})
+            await asyncio.sleep(0)
             
-            display_image_urls = []
-            
-            for img_url in result.image_urls:
-                if not img_url:
-                    continue
-                
-                # Check if URL is already a data URL
-                if img_url.startswith('data:'):
-                    display_image_urls.append(img_url)
-                    continue
-                
-                # For regular URLs, try to download but don't fail if it doesn't work
-                # Freepik URLs may work directly in browser even if server-side download fails
-                try:
-                    import requests
-                    import base64
-                    import os
-                    # Add proper headers with Freepik API key for authentication
-                    freepik_api_key = os.getenv("FREEPIK_API_KEY", "")
-                    headers = {
-                        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                        'Accept': 'image/webp,image/apng,image/*,*/*;q=0.8',
-                        'Accept-Language': 'en-US,en;q=0.9',
-                        'Referer': 'https://www.freepik.com/',
-                        'Origin': 'https://www.freepik.com',
-                        'Accept-Encoding': 'gzip, deflate, br'
-                    }
-                    # Add API key if available (for signed URLs that require auth)
-                    if freepik_api_key:
-                        headers['x-freepik-api-key'] = freepik_api_key
-                    
-                    print(f"   Attempting to download image from: {img_url[:80]}...")
-                    img_response = requests.get(
-                        img_url, 
-                        timeout=20, 
-                        headers=headers,
-                        allow_redirects=True,
-                        stream=True  # Stream for better handling
-                    )
-                    
-                    if img_response.status_code == 200:
-                        img_content = img_response.content
-                        img_base64 = base64.b64encode(img_content).decode('utf-8')
-                        content_type = img_response.headers.get('Content-Type', 'image/jpeg')
-                        # Determine content type from URL or response
-                        if 'png' in content_type.lower() or img_url.lower().endswith('.png'):
-                            data_url = f"data:image/png;base64,{img_base64}"
-                        elif 'webp' in content_type.lower() or img_url.lower().endswith('.webp'):
-                            data_url = f"data:image/webp;base64,{img_base64}"
-                        else:
-                            data_url = f"data:image/jpeg;base64,{img_base64}"
-                        display_image_urls.append(data_url)
-                        print(f"   ✅ Converted image to data URL ({len(data_url)} chars)")
-                        
-                        # Verify image with Gemini vision (check for all products)
-                    else:
-                        # Download failed - use URL directly (browser may handle it better)
-                        print(f"   ⚠️  Server-side download failed ({img_response.status_code}), using URL directly")
-                        print(f"   URL: {img_url[:100]}")
-                        display_image_urls.append(img_url)
-                except Exception as e:
-                    # Error downloading - use URL directly
-                    print(f"   ⚠️  Error downloading image: {str(e)[:100]}")
-                    print(f"   Using URL directly (may work in browser): {img_url[:100]}")
-                    display_image_urls.append(img_url)
+            # Download every image concurrently (order preserved); failures fall back to the URL
+            display_image_urls = await asyncio.gather(*[
+                _fetch_display_url(img_url)
+                for img_url in result.image_urls if img_url
+            ])
             
             generated_images = []
             generated_images.append({
@@ -314,11 +417,11 @@ async def generate_ad_stream(request: AdRequest):
                 "reference_image_url": result.reference_image_url,
             })
             
-            yield f"data: {json.dumps({'step': 'image_complete', 'message': f'Single ad image with all {len(products)} products generated successfully', 'details': {'task_id': result.task_id, 'status': result.status, 'has_image_urls': len(display_image_urls) > 0, 'image_count': len(display_image_urls), 'products_included': len(products)}})}\n\n"
-            await asyncio.sleep(0.1)
+            yield _sse({'step': 'image_complete', 'message': f'Single ad image with all {num_products} products generated successfully', 'details': {'task_id': result.task_id, 'status': result.status, 'has_image_urls': len(display_image_urls) > 0, 'image_count': len(display_image_urls), 'products_included': num_products}})
+            await asyncio.sleep(0)
         else:
-            yield f"data: {json.dumps({'step': 'image_error', 'message': 'Failed to generate image', 'details': {}})}\n\n"
-            await asyncio.sleep(0.1)
+            yield _sse_details(_SSE_IMAGE_ERROR, {})
+            await asyncio.sleep(0)
         
         # Final result - include reasoning and product search results
         product_details = [
@@ -343,35 +446,29 @@ async def generate_ad_stream(request: AdRequest):
             'products': product_details,
             'generated_images': generated_images,
             'search_results': {
-                'count': len(products),
+                'count': num_products,
                 'products': product_details,
                 'top_match': product_details[0] if product_details else None
             }
         }
         
-        # Save to history
-        try:
-            history_dir = Path("history")
-            history_dir.mkdir(exist_ok=True)
-            
-            # Create filename from timestamp and query
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            safe_query = "".join([c if c.isalnum() else "_" for c in request.query])[:30]
-            filename = f"{timestamp}_{safe_query}.json"
-            
-            with open(history_dir / filename, "w") as f:
-                json.dump(final_ad_data, f, indent=2)
-                
-            print(f"✅ Saved ad history to {filename}")
-        except Exception as e:
-            print(f"⚠️ Failed to save history: {e}")
-            
-        yield f"data: {json.dumps({'step': 'complete', **final_ad_data})}\n\n"
+        # Create filename from timestamp and query
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        safe_query = _SANITIZE.sub("_", request.query[:30])
+        filename = f"{timestamp}_{safe_query}.json"
+        
+        # Save to history in the background; scheduled before the final yield so a client
+        # disconnecting right after 'complete' can't cancel the generator before it runs
+        task = asyncio.create_task(asyncio.to_thread(_write_history, filename, final_ad_data))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+        
+        yield _sse({'step': 'complete', **final_ad_data})
         
     except Exception as e:
         import traceback
         traceback.print_exc()
-        yield f"data: {json.dumps({'step': 'error', 'message': str(e)})}\n\n"
+        yield _sse({'step': 'error', 'message': str(e)})
 
 
 @app.post("/api/create-ad")
@@ -387,9 +484,12 @@ async def create_ad(request: AdRequest):
         }
     )
 
+# Upper bound for base64 image fields (~15MB decoded); checked by pydantic-core without copying
+MAX_IMAGE_B64 = 20_000_000
+
 class VideoRequest(BaseModel):
-    original_image: str  # Base64 encoded
-    redesign_image: str  # Base64 encoded
+    original_image: str = Field(min_length=1, max_length=MAX_IMAGE_B64)  # Base64 encoded
+    redesign_image: str = Field(min_length=1, max_length=MAX_IMAGE_B64)  # Base64 encoded
     duration: int = 5
 
 @app.post("/api/generate-video")
@@ -421,7 +521,7 @@ async def generate_video(request: VideoRequest):
 
 
 class Scene3DRequest(BaseModel):
-    image: str  # Base64 encoded rendered landscape image
+    image: str = Field(min_length=1, max_length=MAX_IMAGE_B64)  # Base64 encoded rendered landscape image
     enable_pbr: bool = True
     surface_mode: str = "hard"  # 'hard' for outdoor, 'organic' for plants
     target_polycount: int = 30000
@@ -433,7 +533,7 @@ async def generate_3d_scene(request: Scene3DRequest):
         logger.info(f"📥 Received 3D generation request - image: {len(request.image)} chars")
         from meshy_generator import generate_3d_scene as meshy_generate
 
-        result = meshy_generate(
+        result = await meshy_generate(
             request.image,
             enable_pbr=request.enable_pbr,
             surface_mode=request.surface_mode,
@@ -469,7 +569,7 @@ async def get_3d_status(task_id: str):
     """Get the status of a 3D generation task"""
     try:
         from meshy_generator import get_task_status
-        result = get_task_status(task_id)
+        result = await get_task_status(task_id)
         return result
     except Exception as e:
         logger.error(f"❌ 3D status error: {e}")
@@ -485,18 +585,20 @@ async def get_history():
             
         files = []
         for f in history_dir.glob("*.json"):
+            if f.name.endswith(META_SUFFIX):
+                continue
+            meta_path = f.with_name(_meta_name(f.name))
             try:
-                stat = f.stat()
-                # Read just enough to get the query and timestamp
-                with open(f, "r") as json_file:
-                    data = json.load(json_file)
-                    files.append({
-                        "filename": f.name,
-                        "query": data.get("query", "Unknown"),
-                        "timestamp": data.get("timestamp", stat.st_mtime),
-                        "headline": data.get("ad_copy", {}).get("headline", ""),
-                        "image_url": data.get("generated_images", [{}])[0].get("image_urls", [""])[0] if data.get("generated_images") else ""
-                    })
+                if meta_path.exists():
+                    with open(meta_path, "r") as json_file:
+                        files.append(json.load(json_file))
+                    continue
+                # Older ads have no sidecar: read the full file once and write one
+                with open(f, "rb") as json_file:
+                    entry = _history_entry(f.name, orjson.loads(json_file.read()), f.stat().st_mtime)
+                files.append(entry)
+                with open(meta_path, "w") as json_file:
+                    json.dump(entry, json_file)
             except Exception as e:
                 print(f"Error reading {f}: {e}")
                 continue
@@ -516,13 +618,11 @@ async def get_history_item(filename: str):
         if not file_path.exists():
             raise HTTPException(status_code=404, detail="History item not found")
             
-        with open(file_path, "r") as f:
-            return json.load(f)
+        with open(file_path, "rb") as f:
+            return orjson.loads(f.read())
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 if __name__ == "__main__":
     import uvicorn
-    # Ensure history dir exists
-    Path("history").mkdir(exist_ok=True)
     uvicorn.run(app, host="0.0.0.0", port=8002)
\ No newline at end of file
@@ -4,8 +4,9 @@ Uses plant catalog and RAG data for accurate pricing.
 """
 
 from typing import List, Dict, Any
-from plant_catalog import PlantCatalog
+from plant_catalog import get_catalog
 from pricing_data import get_specific_plant_pricing
+import numpy as np
 import re
 
 def calculate_budget_with_rag(items: List[Dict[str, Any]]) -> Dict[str, Any]:
@@ -18,18 +19,20 @@ def calculate_budget_with_rag(items: List[Dict[str, Any]]) -> Dict[str, Any]:
     Returns:
         Enhanced budget with RAG images and botanical names
     """
-    catalog = PlantCatalog()
-    total_low = 0.0
-    total_high = 0.0
+    catalog = get_catalog()
     breakdown = []
+    unit_prices = []  # (low, high) per item
+    quantities = []
+    
+    # Look up every plant in one batched RAG query
+    matches_by_name = catalog.find_plants_batch([item.get('name', 'Unknown') for item in items], top_k=1)
     
     for item in items:
         name = item.get('name', 'Unknown')
         quantity = item.get('quantity', 1)
         size = item.get('size', '5-gallon')
         
-        # Query RAG for this plant
-        rag_matches = catalog.find_plant(name, top_k=1)
+        rag_matches = matches_by_name[name]
         
         if rag_matches:
             plant = rag_matches[0]
@@ -47,13 +50,8 @@ def calculate_budget_with_rag(items: List[Dict[str, Any]]) -> Dict[str, Any]:
             price_range_str = "$15 - $30"
         
         # Parse price range
-        low, high = parse_price_range(price_range_str)
-        
-        item_total_low = low * quantity
-        item_total_high = high * quantity
-        
-        total_low += item_total_low
-        total_high += item_total_high
+        unit_prices.append(parse_price_range(price_range_str))
+        quantities.append(quantity)
         
         breakdown.append({
             "common_name": common_name,
@@ -62,10 +60,16 @@ def calculate_budget_with_rag(items: List[Dict[str, Any]]) -> Dict[str, Any]:
             "quantity": quantity,
             "size": size,
             "unit_price": price_range_str,
-            "total_estimate": f"${item_total_low:,.2f} - ${item_total_high:,.2f}",
+            "total_estimate": None,  # filled in below
             "rag_verified": bool(botanical_name)
         })
     
+    # Item and grand totals in one vectorized pass
+    item_totals = np.asarray(unit_prices, dtype=np.float64).reshape(-1, 2) * np.asarray(quantities, dtype=np.float64)[:, None]
+    for entry, (item_total_low, item_total_high) in zip(breakdown, item_totals.tolist()):
+        entry["total_estimate"] = f"${item_total_low:,.2f} - ${item_total_high:,.2f}"
+    total_low, total_high = item_totals.sum(axis=0).tolist()
+    
     return {
         "total_low": total_low,
         "total_high": total_high,
@@ -73,26 +77,18 @@ def calculate_budget_with_rag(items: List[Dict[str, Any]]) -> Dict[str, Any]:
         "rag_enhanced": True
     }
 
+# First price and optional "- upper" price, e.g. "$10 - $20", "$1,200", "$800+"
+_PRICE_RE = re.compile(r'\$?\s*(\d[\d,]*(?:\.\d+)?)(?:\s*-\s*\$?\s*(\d[\d,]*(?:\.\d+)?))?')
+
 def parse_price_range(price_str: str) -> tuple:
     """Extract low and high price from string like '$10 - $20'."""
-    clean_str = price_str.replace('$', '').replace(',', '')
-    parts = clean_str.split('-')
-    
-    if len(parts) == 2:
-        try:
-            low = float(parts[0].strip())
-            high = float(parts[1].strip())
-            return low, high
-        except ValueError:
-            pass
-    elif len(parts) == 1:
-        try:
-            val = float(re.sub(r'[^\d.]', '', parts[0]))
-            return val, val
-        except ValueError:
-            pass
+    match = _PRICE_RE.search(price_str)
+    if not match:
+        return 0.0, 0.0
     
-    return 0.0, 0.0
+    low = float(match.group(1).replace(',', ''))
+    high = float(match.group(2).replace(',', '')) if match.group(2) else low
+    return low, high
 
 if __name__ == "__main__":
     # Test with sample items
@@ -21,6 +21,15 @@ from PIL import Image
 COLLECTION_NAME = os.getenv("QDRANT_COLLECTION", "freepik_landscaping")
 TOP_K_RESULTS = 10
 
+# Collection vectors are INT8 scalar-quantized: score on the int8 copies, fetch 2x the
+# candidates and rescore them with the original float vectors to keep recall
+SEARCH_PARAMS = models.SearchParams(
+    quantization=models.QuantizationSearchParams(rescore=True, oversampling=2.0)
+)
+
+# Return every payload field except the ingest-time keyword-search helper
+RESULT_PAYLOAD = models.PayloadSelectorExclude(exclude=["searchable_text_lower"])
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -132,7 +141,9 @@ class FreepikLandscapingAgent:
                 collection_name=COLLECTION_NAME,
                 query=query_vector,
                 limit=top_k,
-                query_filter=search_filter
+                query_filter=search_filter,
+                search_params=SEARCH_PARAMS,
+                with_payload=RESULT_PAYLOAD
             ).points
             
             # Format results
@@ -201,20 +212,13 @@ class FreepikLandscapingAgent:
                 collection_name=COLLECTION_NAME,
                 query=query_vector,
                 limit=top_k,
-                query_filter=search_filter
+                query_filter=search_filter,
+                search_params=SEARCH_PARAMS,
+                with_payload=RESULT_PAYLOAD
             ).points
             
             # Format results
-            results = []
-            for hit in search_results:
-                result = {
-                    "score": hit.score,
-                    "id": hit.id,
-                    "specific_name": hit.payload.get("specific_name"),
-                    "price_estimate": hit.payload.get("price_estimate"),
-                    **hit.payload
-                }
-                results.append(result)
+            results = [self._format_hit(hit) for hit in search_results]
             
             logger.info(f"🔍 Found {len(results)} results for query: '{query}'")
             return results
@@ -223,6 +227,52 @@ class FreepikLandscapingAgent:
             logger.error(f"❌ Search failed: {e}")
             return []
     
+    def search_images_batch(
+        self,
+        queries: List[str],
+        top_k: int = TOP_K_RESULTS
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Semantic search for several queries: one embedding pass and one Qdrant round trip.
+        
+        Args:
+            queries: Natural language search queries
+            top_k: Number of results per query
+        
+        Returns:
+            One result list per query, in the same order
+        """
+        if not queries:
+            return []
+        
+        try:
+            query_vectors = [e.tolist() for e in self.text_embedding_model.embed(queries)]
+            responses = self.qdrant_client.query_batch_points(
+                collection_name=COLLECTION_NAME,
+                requests=[
+                    models.QueryRequest(query=vector, limit=top_k, params=SEARCH_PARAMS, with_payload=RESULT_PAYLOAD)
+                    for vector in query_vectors
+                ]
+            )
+            
+            results = [[self._format_hit(hit) for hit in response.points] for response in responses]
+            logger.info(f"🔍 Batch search: {len(queries)} queries, {sum(map(len, results))} results")
+            return results
+            
+        except Exception as e:
+            logger.error(f"❌ Batch search failed: {e}")
+            return [[] for _ in queries]
+    
+    def _format_hit(self, hit) -> Dict[str, Any]:
+        """Flatten a Qdrant hit into a result dict."""
+        return {
+            "score": hit.score,
+            "id": hit.id,
+            "specific_name": hit.payload.get("specific_name"),
+            "price_estimate": hit.payload.get("price_estimate"),
+            **hit.payload
+        }
+    
     def get_recommendations(
         self,
         query: str,
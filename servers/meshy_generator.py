@@ -6,10 +6,11 @@ The output is a GLB file that can be rendered in Three.js.
 """
 
 import os
-import time
+import asyncio
 import base64
-import requests
+import httpx
 import logging
+import orjson
 from typing import Optional
 
 logger = logging.getLogger(__name__)
@@ -18,8 +19,25 @@ logger = logging.getLogger(__name__)
 MESHY_API_KEY = os.getenv("MESHY_API_KEY")
 MESHY_API_BASE = "https://api.meshy.ai/openapi/v1"
 
-
-def generate_3d_scene(
+# Status polling: back off from POLL_INITIAL up to POLL_MAX seconds; poll every
+# POLL_NEAR_DONE seconds once Meshy reports >90% progress
+POLL_INITIAL = 2.0
+POLL_BACKOFF = 1.5
+POLL_MAX = 15.0
+POLL_NEAR_DONE = 1.0
+
+# Shared async client: polling a job holds no worker thread, and one pooled keep-alive
+# connection serves every poll instead of a TLS handshake each time
+_CLIENT = httpx.AsyncClient(
+    timeout=30,
+    transport=httpx.AsyncHTTPTransport(
+        retries=3,
+        limits=httpx.Limits(max_keepalive_connections=32),
+    ),
+)
+
+
+async def generate_3d_scene(
     image_base64: str,
     enable_pbr: bool = True,
     surface_mode: str = "hard",
@@ -71,11 +89,11 @@ def generate_3d_scene(
             "enable_pbr": enable_pbr,
         }
 
-        create_response = requests.post(
+        create_response = await _CLIENT.post(
             f"{MESHY_API_BASE}/image-to-3d",
             headers=headers,
-            json=create_payload,
-            timeout=30
+            # Multi-MB data URL: orjson encodes it in one C pass (json= would run json.dumps + encode)
+            content=orjson.dumps(create_payload)
         )
 
         if create_response.status_code != 200 and create_response.status_code != 202:
@@ -99,22 +117,22 @@ def generate_3d_scene(
 
         # Step 2: Poll for completion
         max_wait = 300  # 5 minutes max
-        poll_interval = 5  # Check every 5 seconds
-        elapsed = 0
+        delay = POLL_INITIAL
+        elapsed = 0.0
 
         while elapsed < max_wait:
-            logger.info(f"⏳ Polling task status... ({elapsed}s elapsed)")
+            logger.info(f"⏳ Polling task status... ({elapsed:.0f}s elapsed)")
 
-            status_response = requests.get(
+            status_response = await _CLIENT.get(
                 f"{MESHY_API_BASE}/image-to-3d/{task_id}",
-                headers=headers,
-                timeout=30
+                headers=headers
             )
 
             if status_response.status_code != 200:
                 logger.warning(f"⚠️ Status check failed: {status_response.text}")
-                time.sleep(poll_interval)
-                elapsed += poll_interval
+                delay = min(delay * POLL_BACKOFF, POLL_MAX)
+                await asyncio.sleep(delay)
+                elapsed += delay
                 continue
 
             status_data = status_response.json()
@@ -151,27 +169,34 @@ def generate_3d_scene(
                 }
 
             elif status in ["PENDING", "IN_PROGRESS"]:
-                progress = status_data.get("progress", 0)
+                progress = status_data.get("progress") or 0
                 logger.info(f"   Progress: {progress}%")
-                time.sleep(poll_interval)
-                elapsed += poll_interval
+                if progress > 90:
+                    # Nearly done: check back soon instead of overshooting completion
+                    await asyncio.sleep(POLL_NEAR_DONE)
+                    elapsed += POLL_NEAR_DONE
+                else:
+                    delay = min(delay * POLL_BACKOFF, POLL_MAX)
+                    await asyncio.sleep(delay)
+                    elapsed += delay
             else:
                 # Unknown status, keep waiting
-                time.sleep(poll_interval)
-                elapsed += poll_interval
+                delay = min(delay * POLL_BACKOFF, POLL_MAX)
+                await asyncio.sleep(delay)
+                elapsed += delay
 
         return {
             "status": "error",
             "error": f"3D generation timed out after {max_wait} seconds"
         }
 
-    except requests.exceptions.Timeout:
+    except httpx.TimeoutException:
         logger.error("❌ Request timeout")
         return {
             "status": "error",
             "error": "Request to Meshy API timed out"
         }
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         logger.error(f"❌ Request error: {e}")
         return {
             "status": "error",
@@ -185,7 +210,7 @@ def generate_3d_scene(
         }
 
 
-def get_task_status(task_id: str) -> dict:
+async def get_task_status(task_id: str) -> dict:
     """
     Get the status of a 3D generation task.
     Useful for async polling from the frontend.
@@ -198,10 +223,9 @@ def get_task_status(task_id: str) -> dict:
     }
 
     try:
-        response = requests.get(
+        response = await _CLIENT.get(
             f"{MESHY_API_BASE}/image-to-3d/{task_id}",
-            headers=headers,
-            timeout=30
+            headers=headers
         )
 
         if response.status_code != 200:
@@ -4,17 +4,25 @@ Integrates with freepik_landscaping collection for realistic plant selection.
 """
 
 import logging
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 from typing import List, Dict, Any, Optional
 from freepik_agent import FreepikLandscapingAgent
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Plant lookups remembered per catalog, keyed by (normalized name, top_k)
+LOOKUP_CACHE_SIZE = 4096
+
 class PlantCatalog:
     """Interface to query RAG for specific plants with images and pricing."""
     
     def __init__(self):
         self.agent = FreepikLandscapingAgent()
+        self._lookups: "OrderedDict[tuple, List[Dict[str, Any]]]" = OrderedDict()
+        self._lookups_lock = threading.Lock()
         logger.info("✅ Plant Catalog initialized")
     
     def find_plant(self, plant_name: str, top_k: int = 3) -> List[Dict[str, Any]]:
@@ -28,31 +36,23 @@ class PlantCatalog:
         Returns:
             List of plant entries with image, botanical name, and metadata
         """
+        key = (plant_name.strip().lower(), top_k)
+        plants = self._cached(key)
+        if plants is not None:
+            return plants
+        
         logger.info(f"🔍 Searching RAG for: {plant_name}")
         
-        results = self.agent.search_images(plant_name, top_k=top_k)
-        
-        plants = []
-        for result in results:
-            plant_entry = {
-                "common_name": self._extract_common_name(result.get('specific_name', result.get('title'))),
-                "botanical_name": self._extract_botanical_name(result.get('specific_name', '')),
-                "specific_name": result.get('specific_name', result.get('title')),
-                "image_url": result.get('image_url', result.get('url', '')),
-                "score": result.get('score', 0),
-                "tags": result.get('tags', []),
-                "original_title": result.get('title', ''),
-                "price_estimate": result.get('price_estimate', ''),
-                "description": result.get('description', '')
-            }
-            plants.append(plant_entry)
+        results = self.agent.search_images(key[0], top_k=top_k)
+        plants = [self._to_entry(result) for result in results]
+        self._remember(key, plants)
         
         logger.info(f"  Found {len(plants)} matching plants")
         return plants
     
     def find_plants_batch(self, plant_names: List[str], top_k: int = 2) -> Dict[str, List[Dict]]:
         """
-        Find multiple plants at once.
+        Find multiple plants at once (one embedding pass, one Qdrant round trip).
         
         Args:
             plant_names: List of plant names to search for
@@ -61,13 +61,26 @@ class PlantCatalog:
         Returns:
             Dictionary mapping plant names to their results
         """
-        logger.info(f"🔍 Batch searching {len(plant_names)} plants...")
+        keys = {name: (name.strip().lower(), top_k) for name in plant_names}
+        
+        # Serve repeat names from the cache; only the misses go to Qdrant
+        found = {}
+        misses = []
+        for key in dict.fromkeys(keys.values()):
+            plants = self._cached(key)
+            if plants is None:
+                misses.append(key)
+            else:
+                found[key] = plants
         
-        results = {}
-        for plant in plant_names:
-            results[plant] = self.find_plant(plant, top_k=top_k)
+        if misses:
+            logger.info(f"🔍 Batch searching {len(misses)} plants ({len(found)} cached)...")
+            batch = self.agent.search_images_batch([name for name, _ in misses], top_k=top_k)
+            for key, results in zip(misses, batch):
+                found[key] = [self._to_entry(result) for result in results]
+                self._remember(key, found[key])
         
-        return results
+        return {name: found[key] for name, key in keys.items()}
     
     def find_by_category(self, category: str, top_k: int = 10) -> List[Dict[str, Any]]:
         """
@@ -107,6 +120,37 @@ class PlantCatalog:
         results = self.find_plant(botanical_name, top_k=1)
         return results[0] if results else None
     
+    def _cached(self, key: tuple) -> Optional[List[Dict[str, Any]]]:
+        """Cached entries for a lookup key, or None."""
+        with self._lookups_lock:
+            plants = self._lookups.get(key)
+            if plants is not None:
+                self._lookups.move_to_end(key)
+            return plants
+    
+    def _remember(self, key: tuple, plants: List[Dict[str, Any]]):
+        """Cache a lookup result; empty ones aren't kept since they may be transient search failures."""
+        if not plants:
+            return
+        with self._lookups_lock:
+            self._lookups[key] = plants
+            if len(self._lookups) > LOOKUP_CACHE_SIZE:
+                self._lookups.popitem(last=False)
+    
+    def _to_entry(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Shape a search hit into a catalog entry."""
+        return {
+            "common_name": self._extract_common_name(result.get('specific_name', result.get('title'))),
+            "botanical_name": self._extract_botanical_name(result.get('specific_name', '')),
+            "specific_name": result.get('specific_name', result.get('title')),
+            "image_url": result.get('image_url', result.get('url', '')),
+            "score": result.get('score', 0),
+            "tags": result.get('tags', []),
+            "original_title": result.get('title', ''),
+            "price_estimate": result.get('price_estimate', ''),
+            "description": result.get('description', '')
+        }
+    
     def _extract_common_name(self, full_name: str) -> str:
         """Extract common name from 'Common Name (Botanical Name)' format."""
         if '(' in full_name:
@@ -121,6 +165,11 @@ class PlantCatalog:
             return full_name[start:end]
         return ""
 
+@lru_cache(maxsize=1)
+def get_catalog() -> PlantCatalog:
+    """Shared PlantCatalog: the agent, embedding models and lookup cache are built once per process."""
+    return PlantCatalog()
+
 def create_plant_palette(design_plants: List[str]) -> Dict[str, Any]:
     """
     Create a visual plant palette from a design's plant list.
@@ -131,14 +180,15 @@ def create_plant_palette(design_plants: List[str]) -> Dict[str, Any]:
     Returns:
         Dictionary with plant details and images from RAG
     """
-    catalog = PlantCatalog()
+    catalog = get_catalog()
     palette = {
         "plants": [],
         "total_count": len(design_plants)
     }
     
+    matches_by_name = catalog.find_plants_batch(design_plants, top_k=1)
     for plant_name in design_plants:
-        matches = catalog.find_plant(plant_name, top_k=1)
+        matches = matches_by_name[plant_name]
         if matches:
             plant = matches[0]
             palette["plants"].append({
@@ -3,6 +3,8 @@ Real-world pricing estimates for landscaping plants and materials.
 Used to ground the AI recommendations with realistic budget data.
 """
 
+from functools import lru_cache
+
 PRICING_DATABASE = {
     # PLANTS (per unit/pot)
     "tree": {
@@ -166,6 +168,7 @@ def get_pricing_context(search_term: str, tags: list) -> str:
         
     return "Market Pricing Reference:\n" + "\n".join(relevant_prices)
 
+@lru_cache(maxsize=1024)  # the price tables are static, so answers never change
 def get_specific_plant_pricing(botanical_name: str, size: str = "5-gallon") -> str:
     """
     Get specific pricing for a botanical name from RAG data.
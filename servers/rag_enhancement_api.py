@@ -5,28 +5,28 @@ Uses Qdrant's scroll/filter instead of fastembed embeddings for cloud deployment
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional, Union
 import os
+import asyncio
+import importlib.util
 from dotenv import load_dotenv
 import logging
+import threading
 import traceback
+from collections import Counter, OrderedDict
 
 load_dotenv()
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Try fastembed first, fall back to keyword search
-USE_EMBEDDINGS = False
-try:
-    from fastembed import TextEmbedding
-    text_model = TextEmbedding(model_name="Qdrant/clip-ViT-B-32-text")
-    USE_EMBEDDINGS = True
-    logger.info("✅ Fastembed loaded - using semantic search")
-except Exception as e:
-    logger.warning(f"⚠️ Fastembed not available ({e}) - using keyword search fallback")
-    text_model = None
+# Semantic search if fastembed is installed, keyword search otherwise. The text model itself
+# is loaded on the first search (see get_text_model), not at import.
+USE_EMBEDDINGS = importlib.util.find_spec("fastembed") is not None
+_text_model = None
+_text_model_lock = threading.Lock()
 
 from qdrant_client import QdrantClient
 from qdrant_client.http import models
@@ -36,15 +36,79 @@ QDRANT_URL = os.getenv("QDRANT_URL")
 QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
 COLLECTION_NAME = os.getenv("QDRANT_COLLECTION", "freepik_landscaping")
 
+# Payload fields keyword search matches on; title/description get full-text indexes.
+# specific_name keeps the keyword index the rename script filters on, so MatchText on it
+# is an unindexed substring match Qdrant evaluates point by point
+KEYWORD_FIELDS = ("specific_name", "title", "description")
+TEXT_INDEX_FIELDS = ("title", "description")
+# Candidates fetched per keyword-search scroll before local ranking
+KEYWORD_CANDIDATE_LIMIT = 500
+
+# Collection vectors are INT8 scalar-quantized (see scripts/freepik_ingest.py): rescore an
+# oversampled int8 candidate set with the original vectors to keep recall
+SEARCH_PARAMS = models.SearchParams(
+    quantization=models.QuantizationSearchParams(rescore=True, oversampling=2.0)
+)
+# Ingest-time keyword-search helper fields, kept out of search results
+INTERNAL_PAYLOAD_FIELDS = ["searchable_text_lower"]
+RESULT_PAYLOAD = models.PayloadSelectorExclude(exclude=INTERNAL_PAYLOAD_FIELDS)
+
+
+def ensure_text_indexes(client: QdrantClient):
+    """Full-text index the keyword-search fields so matching runs inside Qdrant."""
+    schema = client.get_collection(COLLECTION_NAME).payload_schema
+    for field in TEXT_INDEX_FIELDS:
+        if field not in schema:
+            logger.info(f"🗂️  Creating full-text index on {field}...")
+            client.create_payload_index(
+                collection_name=COLLECTION_NAME,
+                field_name=field,
+                field_schema=models.TextIndexParams(
+                    type=models.TextIndexType.TEXT,
+                    tokenizer=models.TokenizerType.WORD,
+                    lowercase=True
+                )
+            )
+
+
 qdrant_client = None
 if QDRANT_URL and QDRANT_API_KEY:
     try:
         qdrant_client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
         logger.info(f"✅ Connected to Qdrant collection: {COLLECTION_NAME}")
+        if not USE_EMBEDDINGS:
+            ensure_text_indexes(qdrant_client)
     except Exception as e:
         logger.error(f"❌ Qdrant connection failed: {e}")
 
-app = FastAPI(title="RAG Enhancement API (Cloud)")
+
+def get_text_model():
+    """Load the CLIP text model on first use; None (and keyword search from then on) if it can't load."""
+    global _text_model, USE_EMBEDDINGS
+    if _text_model is None:
+        with _text_model_lock:
+            if _text_model is None:
+                try:
+                    from fastembed import TextEmbedding
+                    _text_model = TextEmbedding(model_name="Qdrant/clip-ViT-B-32-text")
+                    logger.info("✅ Fastembed loaded - using semantic search")
+                except Exception as e:
+                    logger.warning(f"⚠️ Fastembed not available ({e}) - using keyword search fallback")
+                    _text_model = False
+                    USE_EMBEDDINGS = False
+                    if qdrant_client:
+                        try:
+                            ensure_text_indexes(qdrant_client)
+                        except Exception as e:
+                            logger.error(f"❌ Could not create text indexes: {e}")
+    return _text_model or None
+
+
+if os.getenv("PRELOAD_EMBEDDINGS") and USE_EMBEDDINGS:
+    get_text_model()
+
+# orjson serializes the palette/breakdown responses much faster than the stdlib encoder
+app = FastAPI(title="RAG Enhancement API (Cloud)", default_response_class=ORJSONResponse)
 
 # CORS
 app.add_middleware(
@@ -76,25 +140,46 @@ def search_by_keyword(query: str, top_k: int = 3) -> List[Dict[str, Any]]:
         return []
     
     try:
-        # Use scroll with keyword filter on specific_name or title
         keywords = query.lower().split()
+        if not keywords:
+            return []
         
-        # Search using scroll and filter results locally
-        all_points, _ = qdrant_client.scroll(
-            collection_name=COLLECTION_NAME,
-            limit=500,  # Get a batch
-            with_payload=True,
-            with_vectors=False
-        )
+        # A keyword matches a point when any of the searchable fields contains it
+        keyword_conditions = [
+            models.Filter(should=[
+                models.FieldCondition(key=field, match=models.MatchText(text=kw))
+                for field in KEYWORD_FIELDS
+            ])
+            for kw in dict.fromkeys(keywords)
+        ]
+        
+        def _scroll(keyword_filter):
+            points, _ = qdrant_client.scroll(
+                collection_name=COLLECTION_NAME,
+                scroll_filter=keyword_filter,
+                limit=KEYWORD_CANDIDATE_LIMIT,
+                with_payload=True,
+                with_vectors=False
+            )
+            return points
+        
+        # Points matching every keyword score highest; only widen to any-keyword matches
+        # when those don't fill top_k
+        candidates = _scroll(models.Filter(must=keyword_conditions))
+        if len(candidates) < top_k and len(keyword_conditions) > 1:
+            candidates = _scroll(models.Filter(should=keyword_conditions))
         
-        # Score each point based on keyword matches
+        # Score each point based on keyword matches; repeated query words are scanned once
+        # (candidates are at most KEYWORD_CANDIDATE_LIMIT short strings, so plain substring checks stay cheap)
+        keyword_counts = Counter(keywords)
         scored_results = []
-        for point in all_points:
+        for point in candidates:
             payload = point.payload or {}
-            searchable_text = f"{payload.get('specific_name', '')} {payload.get('title', '')} {payload.get('description', '')}".lower()
+            # Precomputed at ingest; build it for points ingested before that field existed
+            searchable_text = payload.get("searchable_text_lower") or f"{payload.get('specific_name', '')} {payload.get('title', '')} {payload.get('description', '')}".lower()
             
             # Count keyword matches
-            matches = sum(1 for kw in keywords if kw in searchable_text)
+            matches = sum(count for kw, count in keyword_counts.items() if kw in searchable_text)
             if matches > 0:
                 scored_results.append({
                     "score": matches / len(keywords),
@@ -103,7 +188,7 @@ def search_by_keyword(query: str, top_k: int = 3) -> List[Dict[str, Any]]:
                     "image_url": payload.get("image_url"),
                     "price_estimate": payload.get("price_estimate"),
                     "description": payload.get("description"),
-                    **payload
+                    **{k: v for k, v in payload.items() if k not in INTERNAL_PAYLOAD_FIELDS}
                 })
         
         # Sort by score and return top_k
@@ -115,35 +200,58 @@ def search_by_keyword(query: str, top_k: int = 3) -> List[Dict[str, Any]]:
         return []
 
 
+# Embedding search results remembered per process, keyed by (normalized query, top_k)
+SEARCH_CACHE_SIZE = 4096
+_search_cache: "OrderedDict[tuple, List[Dict[str, Any]]]" = OrderedDict()
+_search_cache_lock = threading.Lock()
+
+
+def _cached_search(key: tuple) -> Optional[List[Dict[str, Any]]]:
+    """Cached results for a search key, or None."""
+    with _search_cache_lock:
+        results = _search_cache.get(key)
+        if results is not None:
+            _search_cache.move_to_end(key)
+        return results
+
+
+def _remember_search(key: tuple, results: List[Dict[str, Any]]):
+    """Cache search results; empty ones aren't kept since they may be transient failures."""
+    if not results:
+        return
+    with _search_cache_lock:
+        _search_cache[key] = results
+        if len(_search_cache) > SEARCH_CACHE_SIZE:
+            _search_cache.popitem(last=False)
+
+
 def search_by_embedding(query: str, top_k: int = 3) -> List[Dict[str, Any]]:
     """Search Qdrant using fastembed embeddings."""
+    text_model = get_text_model()
     if not qdrant_client or not text_model:
         return []
     
+    key = (query.strip().lower(), top_k)
+    results = _cached_search(key)
+    if results is not None:
+        return results
+    
     try:
         # Generate query embedding
-        embeddings = list(text_model.embed([query]))
+        embeddings = list(text_model.embed([key[0]]))
         query_vector = embeddings[0].tolist()
         
         # Search
         search_results = qdrant_client.query_points(
             collection_name=COLLECTION_NAME,
             query=query_vector,
-            limit=top_k
+            limit=top_k,
+            search_params=SEARCH_PARAMS,
+            with_payload=RESULT_PAYLOAD
         ).points
         
-        results = []
-        for hit in search_results:
-            results.append({
-                "score": hit.score,
-                "specific_name": hit.payload.get("specific_name"),
-                "title": hit.payload.get("title"),
-                "image_url": hit.payload.get("image_url"),
-                "price_estimate": hit.payload.get("price_estimate"),
-                "description": hit.payload.get("description"),
-                **hit.payload
-            })
-        
+        results = [_hit_to_result(hit) for hit in search_results]
+        _remember_search(key, results)
         return results
         
     except Exception as e:
@@ -151,13 +259,79 @@ def search_by_embedding(query: str, top_k: int = 3) -> List[Dict[str, Any]]:
         return []
 
 
+def search_by_embedding_batch(queries: List[str], top_k: int = 3) -> List[List[Dict[str, Any]]]:
+    """Search Qdrant for several queries with one embedding pass and one round trip."""
+    text_model = get_text_model() if queries else None
+    if not qdrant_client or not text_model:
+        return [[] for _ in queries]
+    
+    keys = [(query.strip().lower(), top_k) for query in queries]
+    
+    # Serve repeat queries from the cache; only the misses are embedded and searched
+    found = {}
+    misses = []
+    for key in dict.fromkeys(keys):
+        results = _cached_search(key)
+        if results is None:
+            misses.append(key)
+        else:
+            found[key] = results
+    
+    if misses:
+        try:
+            query_vectors = [e.tolist() for e in text_model.embed([query for query, _ in misses])]
+            responses = qdrant_client.query_batch_points(
+                collection_name=COLLECTION_NAME,
+                requests=[
+                    models.QueryRequest(query=vector, limit=top_k, params=SEARCH_PARAMS, with_payload=RESULT_PAYLOAD)
+                    for vector in query_vectors
+                ]
+            )
+            for key, response in zip(misses, responses):
+                found[key] = [_hit_to_result(hit) for hit in response.points]
+                _remember_search(key, found[key])
+            
+        except Exception as e:
+            logger.error(f"Batch embedding search failed: {e}")
+    
+    return [found.get(key, []) for key in keys]
+
+
+def _hit_to_result(hit) -> Dict[str, Any]:
+    """Flatten a Qdrant hit into a search result."""
+    return {
+        "score": hit.score,
+        "specific_name": hit.payload.get("specific_name"),
+        "title": hit.payload.get("title"),
+        "image_url": hit.payload.get("image_url"),
+        "price_estimate": hit.payload.get("price_estimate"),
+        "description": hit.payload.get("description"),
+        **hit.payload
+    }
+
+
 def search_plants(query: str, top_k: int = 3) -> List[Dict[str, Any]]:
     """Search for plants using best available method."""
-    if USE_EMBEDDINGS:
+    if USE_EMBEDDINGS and get_text_model():
         return search_by_embedding(query, top_k)
     return search_by_keyword(query, top_k)
 
 
+def search_plants_batch(queries: List[str], top_k: int = 3) -> List[List[Dict[str, Any]]]:
+    """Search for several plants at once; one result list per query, in order."""
+    if USE_EMBEDDINGS and get_text_model():
+        return search_by_embedding_batch(queries, top_k)
+    return [search_by_keyword(query, top_k) for query in queries]
+
+
+def _coerce_qty(quantity) -> int:
+    """Whole-unit quantity from an int, float or numeric string; anything else counts as 1."""
+    try:
+        return max(1, int(float(quantity)))
+    except (TypeError, ValueError, OverflowError):
+        return 1
+
+
 @app.post("/api/enhance-with-rag")
 async def enhance_with_rag(request: EnhancementRequest):
     """Enhance a design with RAG data."""
@@ -167,18 +341,17 @@ async def enhance_with_rag(request: EnhancementRequest):
     try:
         plant_palette = []
         
-        for plant_item in request.plants:
-            results = search_plants(plant_item.name, top_k=1)
-            
+        # Look up every plant in one batched search; it runs on a worker thread because the
+        # first call loads the CLIP model and embedding + Qdrant are blocking (keeps /health responsive)
+        results_by_item = await asyncio.to_thread(
+            search_plants_batch, [plant_item.name for plant_item in request.plants], top_k=1
+        )
+        
+        for plant_item, results in zip(request.plants, results_by_item):
             if results:
                 plant = results[0]
                 
-                # Handle quantity
-                quantity = 1
-                if isinstance(plant_item.quantity, (int, float)):
-                    quantity = int(plant_item.quantity)
-                elif isinstance(plant_item.quantity, str) and plant_item.quantity.isdigit():
-                    quantity = int(plant_item.quantity)
+                quantity = _coerce_qty(plant_item.quantity)
                 
                 # Get price
                 unit_price = plant.get('price_estimate', '$25')